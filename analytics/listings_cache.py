@@ -0,0 +1,174 @@
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from common import instrumentation
+
+try:
+    from .signal_state import SERIES_KEY, with_series_key
+except ImportError:  # Loaded as a standalone file by functions-framework
+    from signal_state import SERIES_KEY, with_series_key
+
+# --- Configuration ---
+LISTINGS_CACHE_DIR = os.getenv("LISTINGS_CACHE_DIR") # e.g. .cache/listings; unset disables the cache
+LOOKBACK_DAYS = 35
+CACHE_COLUMNS = ["asset_type", SERIES_KEY, "ingestion_timestamp", "price"]
+CACHE_LAYOUT_VERSION = 2 # bump when CACHE_COLUMNS change; older partitions are dropped on refresh
+LAYOUT_FILE = "_layout.json"
+
+# A fetcher returns listing batches ingested after the given watermark (all rows when None)
+Fetcher = Callable[[Optional[datetime]], Iterable[pd.DataFrame]]
+
+# --- Partition Layout ---
+def _partition_dir(cache_dir: str, day: date) -> str:
+    return os.path.join(cache_dir, f"date={day.isoformat()}")
+
+def list_partitions(cache_dir: str) -> list[tuple[date, str]]:
+    """Returns (day, path) for every cached date partition, oldest first."""
+    if not os.path.isdir(cache_dir):
+        return []
+    partitions = []
+    for name in os.listdir(cache_dir):
+        if name.startswith("date="):
+            partitions.append((date.fromisoformat(name[len("date="):]), os.path.join(cache_dir, name)))
+    return sorted(partitions)
+
+def _read_partition(path: str, columns: Optional[list] = None) -> pa.Table:
+    tables = [
+        pq.read_table(os.path.join(path, name), columns=columns, memory_map=True)
+        for name in sorted(os.listdir(path))
+        if name.endswith(".parquet")
+    ]
+    return pa.concat_tables(tables) if tables else pa.table({})
+
+# --- Layout ---
+def _layout(series_fields: Iterable[str]) -> dict:
+    return {"version": CACHE_LAYOUT_VERSION, "series_fields": list(series_fields)}
+
+def ensure_layout(cache_dir: str, series_fields: Iterable[str] = ()) -> bool:
+    """
+    Drops every cached partition if the cache was written with other columns
+    or other series fields, since its series keys would no longer match.
+    Returns True when the cache was invalidated.
+    """
+    layout = _layout(series_fields)
+    path = os.path.join(cache_dir, LAYOUT_FILE)
+    try:
+        with open(path) as f:
+            if json.load(f) == layout:
+                return False
+    except (OSError, ValueError):
+        pass
+    partitions = list_partitions(cache_dir)
+    for _, partition in partitions:
+        shutil.rmtree(partition)
+    if partitions:
+        print(f"Listings cache layout changed, dropped {len(partitions)} partitions.")
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(layout, f)
+    return bool(partitions)
+
+# --- Watermark ---
+def cached_watermark(cache_dir: str) -> Optional[datetime]:
+    """Returns the newest cached ingestion_timestamp, reading only the newest partition."""
+    for _, path in reversed(list_partitions(cache_dir)):
+        timestamps = _read_partition(path, columns=["ingestion_timestamp"])
+        if timestamps.num_rows:
+            newest = pc.max(timestamps["ingestion_timestamp"]).as_py()
+            return newest if newest.tzinfo else newest.replace(tzinfo=timezone.utc)
+    return None
+
+# --- Cache Maintenance ---
+def write_batch(cache_dir: str, batch: pd.DataFrame):
+    """Appends a batch to the cache, split into one Parquet file per ingestion date."""
+    frame = with_series_key(batch)[CACHE_COLUMNS].copy()
+    frame['asset_type'] = frame['asset_type'].astype(str)
+    frame[SERIES_KEY] = frame[SERIES_KEY].astype(str)
+    frame['ingestion_timestamp'] = pd.to_datetime(frame['ingestion_timestamp'], utc=True)
+    for day, rows in frame.groupby(frame['ingestion_timestamp'].dt.date):
+        path = _partition_dir(cache_dir, day)
+        os.makedirs(path, exist_ok=True)
+        table = pa.Table.from_pandas(rows, preserve_index=False)
+        pq.write_table(table, os.path.join(path, f"part-{time.time_ns()}.parquet"))
+
+def evict_partitions(cache_dir: str, now: Optional[datetime] = None) -> int:
+    """Deletes partitions that lie entirely outside the lookback window."""
+    now = now or datetime.now(timezone.utc)
+    oldest_day = (now - timedelta(days=LOOKBACK_DAYS)).date()
+    evicted = 0
+    for day, path in list_partitions(cache_dir):
+        if day < oldest_day:
+            shutil.rmtree(path)
+            evicted += 1
+    return evicted
+
+def refresh_cache(cache_dir: str, fetch: Fetcher, series_fields: Iterable[str] = ()) -> int:
+    """
+    Fetches only the rows newer than the cached watermark, appends them to the
+    date partitions and evicts partitions past the lookback. `series_fields`
+    are the fields the fetched series keys were built from; a cache built
+    from other fields is discarded first.
+    Returns the number of rows added.
+    """
+    ensure_layout(cache_dir, series_fields)
+    watermark = cached_watermark(cache_dir)
+    print(f"Refreshing listings cache in {cache_dir}{f' since {watermark}' if watermark else ''}...")
+    added = 0
+    for batch in fetch(watermark):
+        if not batch.empty:
+            write_batch(cache_dir, batch)
+            added += len(batch)
+    evicted = evict_partitions(cache_dir)
+    print(f"Listings cache refreshed: {added} rows added, {evicted} partitions evicted.")
+    return added
+
+# --- Reading ---
+def iter_cached_batches(cache_dir: str, now: Optional[datetime] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yields the cached lookback window one date partition at a time, oldest
+    first and sorted by ingestion_timestamp, ready for calculate_signals_streaming.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = pd.Timestamp(now - timedelta(days=LOOKBACK_DAYS))
+    for _, path in list_partitions(cache_dir):
+        df = _read_partition(path, columns=CACHE_COLUMNS).to_pandas()
+        if df.empty:
+            continue
+        df['asset_type'] = df['asset_type'].astype('category')
+        df[SERIES_KEY] = df[SERIES_KEY].astype('category')
+        df['ingestion_timestamp'] = pd.to_datetime(df['ingestion_timestamp'], utc=True)
+        df = df[df['ingestion_timestamp'] >= cutoff]
+        if not df.empty:
+            instrumentation.count("rows_loaded", len(df), source="cache")
+            yield df.sort_values('ingestion_timestamp', ignore_index=True)
+
+def read_cache(cache_dir: str, now: Optional[datetime] = None) -> pd.DataFrame:
+    """Reads the whole cached lookback window, sorted like load_data_from_bigquery."""
+    frames = [frame.astype({'asset_type': str, SERIES_KEY: str}) for frame in iter_cached_batches(cache_dir, now)]
+    if not frames:
+        return pd.DataFrame(columns=CACHE_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    df['asset_type'] = df['asset_type'].astype('category')
+    df[SERIES_KEY] = df[SERIES_KEY].astype('category')
+    df.sort_values(by=['asset_type', 'ingestion_timestamp'], inplace=True)
+    return df
+
+# To re-run the signal calculation offline against the cached window:
+# `LISTINGS_CACHE_DIR=.cache/listings python -m analytics.listings_cache`
+if __name__ == "__main__":
+    from analytics.calculate_signals import calculate_signals
+
+    if not LISTINGS_CACHE_DIR:
+        raise SystemExit("LISTINGS_CACHE_DIR must be set.")
+    window_df = read_cache(LISTINGS_CACHE_DIR)
+    print(f"Read {len(window_df)} cached rows.")
+    print(calculate_signals(window_df).to_string())
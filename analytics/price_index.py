@@ -0,0 +1,155 @@
+from typing import Dict, Iterable, Iterator, Optional
+
+import pandas as pd
+from sqlalchemy import text
+
+# --- Configuration ---
+INDICES_TABLE = "indices"
+INDEX_BASE = 1000.0
+AGGREGATE_COLUMNS = ["asset_type", "day", "price_sum", "price_count", "watermark"]
+# watermark is the newest ingestion_timestamp folded into the index, so a re-run never folds a row twice
+INDEX_COLUMNS = ["name", "asset_type", "value", "day", "day_sum", "day_count", "prev_value", "prev_mean", "watermark"]
+
+def index_name(asset_type: str) -> str:
+    """e.g. 'watch' -> 'WatchIndex', 'private_jet' -> 'PrivateJetIndex'."""
+    return f"{str(asset_type).replace('_', ' ').title().replace(' ', '')}Index"
+
+# --- Daily Aggregates ---
+def daily_aggregates(df: pd.DataFrame) -> pd.DataFrame:
+    """Per asset class and UTC day: sum and count of prices, and the newest ingestion_timestamp."""
+    if df.empty:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS)
+    timestamps = pd.to_datetime(df['ingestion_timestamp'], utc=True)
+    grouped = df.assign(day=timestamps.dt.date, watermark=timestamps).groupby(['asset_type', 'day'], observed=True)
+    aggregates = grouped.agg(price_sum=('price', 'sum'), price_count=('price', 'count'), watermark=('watermark', 'max')).reset_index()
+    aggregates['asset_type'] = aggregates['asset_type'].astype(str)
+    return aggregates
+
+class DailyAggregator:
+    """
+    Accumulates daily aggregates from the batches flowing into the signal
+    engine, so the index costs no extra pass over the data. Rows at or before
+    an asset class's entry in `since` (see index_watermarks) were already
+    folded into its index and are left out.
+    """
+
+    def __init__(self, since: Optional[Dict[str, pd.Timestamp]] = None):
+        self.since = since or {}
+        self._parts: list = []
+
+    def observe(self, batches: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for batch in batches:
+            self._parts.append(daily_aggregates(self._unfolded(batch)))
+            yield batch
+
+    def _unfolded(self, batch: pd.DataFrame) -> pd.DataFrame:
+        if not self.since or batch.empty:
+            return batch
+        cutoff = batch['asset_type'].astype(str).map(self.since)
+        timestamps = pd.to_datetime(batch['ingestion_timestamp'], utc=True)
+        return batch[cutoff.isna() | (timestamps > pd.to_datetime(cutoff, utc=True))]
+
+    def frame(self) -> pd.DataFrame:
+        parts = [part for part in self._parts if not part.empty]
+        if not parts:
+            return pd.DataFrame(columns=AGGREGATE_COLUMNS)
+        combined = pd.concat(parts, ignore_index=True)
+        return combined.groupby(['asset_type', 'day'], as_index=False).agg(
+            price_sum=('price_sum', 'sum'), price_count=('price_count', 'sum'), watermark=('watermark', 'max'),
+        )
+
+# --- Chained Mean Index ---
+def chain_indices(state_df: pd.DataFrame, aggregates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rolls each asset class's chained daily-mean index forward:
+    index_day = index_prev_day * mean_day / mean_prev_day, starting at INDEX_BASE.
+
+    `state_df` holds the current index rows (see INDEX_COLUMNS). Rows for the
+    index's current day are merged into it, so a day split across runs is
+    aggregated exactly once. Each row's watermark advances to the newest
+    ingestion_timestamp folded in. Returns the updated rows for touched classes.
+    """
+    state = {row['asset_type']: dict(row) for row in state_df.to_dict(orient='records')}
+    updated = {}
+    for asset_type, days in aggregates.sort_values('day').groupby('asset_type', sort=False):
+        row = state.get(asset_type)
+        for day, price_sum, price_count, watermark in days[['day', 'price_sum', 'price_count', 'watermark']].itertuples(index=False):
+            if row is None:
+                row = {"name": index_name(asset_type), "asset_type": asset_type, "value": INDEX_BASE,
+                       "day": day, "day_sum": 0.0, "day_count": 0, "prev_value": None, "prev_mean": None, "watermark": None}
+            if pd.isna(row.get("watermark")) or watermark > row["watermark"]:
+                row = {**row, "watermark": watermark}
+            if day < row["day"]:
+                continue  # already folded into an earlier value
+            elif day > row["day"]:
+                row = {**row, "prev_value": row["value"], "prev_mean": row["day_sum"] / row["day_count"],
+                       "day": day, "day_sum": 0.0, "day_count": 0}
+            row = {**row, "day_sum": row["day_sum"] + price_sum, "day_count": row["day_count"] + price_count}
+            if row["prev_mean"]:
+                row["value"] = row["prev_value"] * (row["day_sum"] / row["day_count"]) / row["prev_mean"]
+        if row is not None:
+            updated[asset_type] = row
+    return pd.DataFrame(list(updated.values()), columns=INDEX_COLUMNS)
+
+# --- Persistence ---
+def ensure_indices_table(engine):
+    """Creates the materialized indices table if it does not exist yet."""
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {INDICES_TABLE} (
+                name TEXT PRIMARY KEY,
+                asset_type TEXT NOT NULL,
+                value DOUBLE PRECISION NOT NULL,
+                day DATE NOT NULL,
+                day_sum DOUBLE PRECISION NOT NULL,
+                day_count BIGINT NOT NULL,
+                prev_value DOUBLE PRECISION,
+                prev_mean DOUBLE PRECISION,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """))
+        # Added to make incremental updates idempotent; older rows fold everything they are given once
+        connection.execute(text(f"ALTER TABLE {INDICES_TABLE} ADD COLUMN IF NOT EXISTS watermark TIMESTAMPTZ"))
+
+def load_index_state(engine) -> pd.DataFrame:
+    ensure_indices_table(engine)
+    with engine.connect() as connection:
+        state_df = pd.read_sql(text(f"SELECT {', '.join(INDEX_COLUMNS)} FROM {INDICES_TABLE}"), connection)
+    state_df['watermark'] = pd.to_datetime(state_df['watermark'], utc=True)
+    return state_df
+
+def index_watermarks(state_df: pd.DataFrame) -> Dict[str, pd.Timestamp]:
+    """Per asset class, the newest ingestion_timestamp already folded into its index."""
+    known = state_df.dropna(subset=['watermark'])
+    return dict(zip(known['asset_type'].astype(str), pd.to_datetime(known['watermark'], utc=True), strict=True))
+
+def save_indices(engine, indices_df: pd.DataFrame):
+    """Upserts the updated index rows, one row per asset class."""
+    if indices_df.empty:
+        return
+    records = indices_df.astype(object).where(indices_df.notna(), None).to_dict(orient='records')
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            INSERT INTO {INDICES_TABLE} ({', '.join(INDEX_COLUMNS)}, updated_at)
+            VALUES ({', '.join(f':{name}' for name in INDEX_COLUMNS)}, NOW())
+            ON CONFLICT (name) DO UPDATE SET
+                {', '.join(f'{name} = EXCLUDED.{name}' for name in INDEX_COLUMNS[1:])},
+                updated_at = NOW()
+        """), records)
+    print(f"Updated {len(records)} price indices.")
+
+def update_indices(engine, aggregates: pd.DataFrame, reset: bool = False, state_df: Optional[pd.DataFrame] = None):
+    """
+    Folds a run's daily aggregates into the materialized indices. With
+    `reset`, indices are rebuilt from the aggregates alone (full recomputes).
+    Pass the `state_df` the aggregates were filtered against (see
+    DailyAggregator) to avoid reading it again.
+    """
+    if aggregates.empty:
+        return
+    if reset:
+        ensure_indices_table(engine)
+        state_df = pd.DataFrame(columns=INDEX_COLUMNS)
+    elif state_df is None:
+        state_df = load_index_state(engine)
+    save_indices(engine, chain_indices(state_df, aggregates))
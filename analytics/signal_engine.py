@@ -0,0 +1,278 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# --- Signal Parameters ---
+ROLLING_WINDOW = 30
+MIN_PERIODS = 5
+DISCOUNT_RATIO = 0.9
+Z_SCORE_THRESHOLD = -2.0
+
+# --- Parallelism ---
+WORKERS = 1 # 1 computes in-process
+SHARD_ROWS = 1_000_000 # target rows per shard; a series is never split across shards
+
+
+# --- Group Layout ---
+def group_codes(keys) -> np.ndarray:
+    """
+    Integer series codes for one key column or a DataFrame of key columns
+    (a composite key), from a single hash-based pass. Rows with any missing
+    key part get code -1, mirroring groupby's dropna behaviour.
+    """
+    if isinstance(keys, pd.DataFrame):
+        codes = keys.groupby(list(keys.columns), sort=False, observed=True, dropna=True).ngroup()
+        return codes.to_numpy(dtype=np.int64, na_value=-1)
+    codes, _ = pd.factorize(keys, sort=False)
+    return codes
+
+def group_layout(keys, times: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (order, codes, starts) for a key column or a DataFrame of key columns.
+
+    `order` is a stable permutation that makes every group contiguous while
+    keeping the original row order inside each group (the order pandas'
+    groupby().transform() sees), or ordering each group by `times` when given.
+    `codes` are the group codes in that order and `starts[i]` is the position
+    where the group of row i begins.
+    """
+    codes = group_codes(keys)
+    order = np.argsort(codes, kind="stable") if times is None else np.lexsort((times, codes))
+    sorted_codes = codes[order]
+    n = len(sorted_codes)
+    boundaries = np.empty(n, dtype=bool)
+    if n:
+        boundaries[0] = True
+        boundaries[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    starts = np.maximum.accumulate(np.where(boundaries, np.arange(n), 0))
+    return order, sorted_codes, starts
+
+def parse_window(window) -> Union[int, pd.Timedelta]:
+    """Accepts a row count (30, "30") or a time span ("30D", "12h", a Timedelta)."""
+    if isinstance(window, (int, np.integer)):
+        return int(window)
+    if isinstance(window, str) and window.strip().isdigit():
+        return int(window)
+    return pd.Timedelta(window)
+
+def time_window_starts(codes: np.ndarray, times: np.ndarray, window: pd.Timedelta) -> np.ndarray:
+    """
+    For rows laid out by (code, time), the position of the first row in each
+    row's trailing (t - window, t] window, as pandas' offset windows define it.
+
+    Every row's window start is found with one lexsort that merges the rows
+    with their (code, t - window) lower bounds, instead of a search per group.
+    """
+    n = len(codes)
+    times = times.astype(np.int64, copy=False)
+    bounds = times - window.value
+    merged = np.lexsort((
+        np.r_[np.zeros(n, dtype=np.int8), np.ones(n, dtype=np.int8)], # rows sort before an equal bound
+        np.r_[times, bounds],
+        np.r_[codes, codes],
+    ))
+    is_bound = merged >= n
+    rows_before = np.cumsum(~is_bound)
+    starts = np.empty(n, dtype=np.int64)
+    starts[merged[is_bound] - n] = rows_before[is_bound]
+    return starts
+
+
+# --- Rolling Statistics ---
+def rolling_mean_std(
+    values: np.ndarray,
+    codes: np.ndarray,
+    starts: np.ndarray,
+    window: int = ROLLING_WINDOW,
+    min_periods: int = MIN_PERIODS,
+    window_starts: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes per-group trailing rolling mean and sample std in one pass.
+
+    `values` must already be laid out contiguously by group (see group_layout).
+    Windows span the last `window` rows, or start at `window_starts` when given
+    (see time_window_starts).
+    Window sums come from differences of per-group cumulative sums; values are
+    centred on their group mean first so the sum of squares keeps its precision.
+    NaNs are skipped and do not count towards `min_periods`, as in pandas.
+    """
+    n = len(values)
+    values = np.asarray(values, dtype=np.float64)
+    if n == 0:
+        return np.empty(0), np.empty(0)
+
+    valid = ~np.isnan(values)
+    group_ids = codes - codes.min()
+    counts = np.bincount(group_ids, weights=valid)
+    totals = np.bincount(group_ids, weights=np.where(valid, values, 0.0))
+    centres = np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+    centre = centres[group_ids]
+
+    x = np.where(valid, values - centre, 0.0)
+    # Cumulative sums restart at every group so rounding error stays bounded by
+    # the length of one series rather than the whole frame.
+    sums = pd.DataFrame({"n": valid.astype(np.float64), "x": x, "xx": x * x})
+    cum = sums.groupby(group_ids, sort=False).cumsum().to_numpy()
+
+    prev = np.arange(n) - window if window_starts is None else window_starts - 1
+    has_prev = prev >= starts
+    dropped = np.where(has_prev[:, None], cum[np.maximum(prev, 0)], 0.0)
+    nobs, s1, s2 = (cum - dropped).T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s1 / nobs + centre
+        var = (s2 - s1 * s1 / nobs) / (nobs - 1)
+    std = np.sqrt(np.maximum(var, 0.0))
+
+    enough = nobs >= max(min_periods, 1)
+    mean = np.where(enough, mean, np.nan)
+    std = np.where(enough & (nobs >= 2), std, np.nan)
+    return mean, std
+
+
+# --- Parallel Rolling Statistics ---
+def shard_bounds(starts: np.ndarray, shard_rows: int) -> list[tuple[int, int]]:
+    """
+    Splits a group-contiguous layout into [lo, hi) shards of roughly
+    `shard_rows` rows, cutting only at group boundaries.
+    """
+    n = len(starts)
+    bounds, lo = [], 0
+    while lo < n:
+        target = min(lo + max(shard_rows, 1), n)
+        # Extend to the end of the group that contains row target - 1
+        hi = n if target == n else int(np.searchsorted(starts, starts[target - 1], side="right"))
+        bounds.append((lo, hi))
+        lo = hi
+    return bounds
+
+SHARED_DTYPES = {
+    "values": np.float64, "codes": np.int64, "starts": np.int64, "window_starts": np.int64,
+    "mean": np.float64, "std": np.float64,
+}
+
+def _attach(name: str, n: int, dtype) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray((n,), dtype=dtype, buffer=block.buf)
+
+def _rolling_shard(names: dict, n: int, lo: int, hi: int, window: int, min_periods: int):
+    """Worker: computes one shard reading from and writing to shared memory, so no rows are pickled."""
+    blocks, arrays = [], {}
+    try:
+        for key, name in names.items():
+            block, arrays[key] = _attach(name, n, SHARED_DTYPES[key])
+            blocks.append(block)
+        window_starts = arrays["window_starts"][lo:hi] - lo if "window_starts" in arrays else None
+        mean, std = rolling_mean_std(
+            arrays["values"][lo:hi], arrays["codes"][lo:hi], arrays["starts"][lo:hi] - lo,
+            window, min_periods, window_starts,
+        )
+        arrays["mean"][lo:hi] = mean
+        arrays["std"][lo:hi] = std
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+def rolling_mean_std_parallel(
+    values: np.ndarray,
+    codes: np.ndarray,
+    starts: np.ndarray,
+    window: int = ROLLING_WINDOW,
+    min_periods: int = MIN_PERIODS,
+    workers: int = WORKERS,
+    shard_rows: int = SHARD_ROWS,
+    window_starts: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    rolling_mean_std over contiguous shards on a process pool. Inputs and
+    outputs live in shared memory; workers only receive block names and
+    shard bounds. Falls back to a single pass when there is one shard.
+    """
+    n = len(values)
+    bounds = shard_bounds(starts, shard_rows)
+    if workers <= 1 or len(bounds) <= 1:
+        return rolling_mean_std(values, codes, starts, window, min_periods, window_starts)
+
+    inputs = {"values": values, "codes": codes, "starts": starts, "mean": None, "std": None}
+    if window_starts is not None:
+        inputs["window_starts"] = window_starts
+    blocks, names, arrays = [], {}, {}
+    try:
+        for key, source in inputs.items():
+            block = shared_memory.SharedMemory(create=True, size=max(n * 8, 1))
+            blocks.append(block)
+            names[key] = block.name
+            arrays[key] = np.ndarray((n,), dtype=SHARED_DTYPES[key], buffer=block.buf)
+            if source is not None:
+                arrays[key][:] = source
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds))) as pool:
+            futures = [pool.submit(_rolling_shard, names, n, lo, hi, window, min_periods) for lo, hi in bounds]
+            for future in futures:
+                future.result()
+        return arrays["mean"].copy(), arrays["std"].copy()
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+# --- Signal Engine ---
+def compute_rolling_signals(
+    df: pd.DataFrame,
+    group_col: Union[str, list[str]] = "asset_type",
+    value_col: str = "price",
+    window: Union[int, str, pd.Timedelta] = ROLLING_WINDOW,
+    min_periods: int = MIN_PERIODS,
+    workers: int = WORKERS,
+    shard_rows: int = SHARD_ROWS,
+    time_col: str = "ingestion_timestamp",
+) -> pd.DataFrame:
+    """
+    Adds rolling_mean_30d, rolling_std_30d, z_score, discount_signal,
+    z_score_signal and is_deal columns to `df` in place and returns it.
+
+    `group_col` may list several columns to key series on a composite key.
+    `window` is a row count or a time span such as "30D", which covers the
+    observations in (t - window, t] by `time_col`. With `workers` > 1, series
+    are sharded across a process pool.
+    """
+    window = parse_window(window)
+    keys = df[group_col] if isinstance(group_col, str) else df[list(group_col)]
+    times = None
+    if isinstance(window, pd.Timedelta):
+        times = pd.to_datetime(df[time_col], utc=True).to_numpy(dtype="datetime64[ns]").view(np.int64)
+    order, codes, starts = group_layout(keys, times)
+    window_starts = None if times is None else time_window_starts(codes, times[order], window)
+    values = df[value_col].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+    mean_sorted, std_sorted = rolling_mean_std_parallel(
+        values, codes, starts, window if times is None else 0, min_periods, workers, shard_rows, window_starts
+    )
+
+    # Rows without a group key are excluded by groupby, so they get no stats.
+    ungrouped = codes < 0
+    mean_sorted[ungrouped] = np.nan
+    std_sorted[ungrouped] = np.nan
+
+    mean = np.empty_like(mean_sorted)
+    std = np.empty_like(std_sorted)
+    mean[order] = mean_sorted
+    std[order] = std_sorted
+
+    price = df[value_col].to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = (price - mean) / std
+
+    df["rolling_mean_30d"] = mean
+    df["rolling_std_30d"] = std
+    df["z_score"] = z_score
+    df["discount_signal"] = price <= mean * DISCOUNT_RATIO
+    df["z_score_signal"] = z_score <= Z_SCORE_THRESHOLD
+    df["is_deal"] = df["discount_signal"] | df["z_score_signal"]
+    return df
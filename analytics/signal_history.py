@@ -0,0 +1,41 @@
+from sqlalchemy import column, table, text
+
+# --- Configuration ---
+HISTORY_TABLE = "signal_history"
+HISTORY_TABLE_CLAUSE = table(
+    HISTORY_TABLE,
+    column("asset_type"),
+    column("last_price"),
+    column("rolling_mean_30d"),
+    column("z_score"),
+    column("is_deal"),
+    column("updated_at"),
+)
+
+# --- Schema ---
+def ensure_history_table(engine):
+    """
+    Creates the append-only signal history table if it does not exist yet.
+    The (updated_at, id) ordering backs keyset pagination in the API, with and
+    without an asset_type filter.
+    """
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+                id BIGSERIAL PRIMARY KEY,
+                asset_type TEXT NOT NULL,
+                last_price DOUBLE PRECISION,
+                rolling_mean_30d DOUBLE PRECISION,
+                z_score DOUBLE PRECISION,
+                is_deal BOOLEAN,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {HISTORY_TABLE}_asset_type_updated_at_idx "
+            f"ON {HISTORY_TABLE} (asset_type, updated_at DESC, id DESC)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {HISTORY_TABLE}_updated_at_idx "
+            f"ON {HISTORY_TABLE} (updated_at DESC, id DESC)"
+        ))
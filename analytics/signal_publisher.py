@@ -0,0 +1,93 @@
+import functools
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Optional
+
+# --- Configuration ---
+SIGNALS_TOPIC = os.getenv("SIGNALS_PUBSUB_TOPIC", "") # projects/<project>/topics/<topic>; empty disables publishing
+PUBLISH_MAX_MESSAGES = int(os.getenv("PUBLISH_MAX_MESSAGES", "100"))
+PUBLISH_MAX_BYTES = int(os.getenv("PUBLISH_MAX_BYTES", str(1024 * 1024)))
+PUBLISH_MAX_LATENCY = float(os.getenv("PUBLISH_MAX_LATENCY", "0.05")) # seconds
+PUBLISH_TIMEOUT = float(os.getenv("PUBLISH_TIMEOUT", "60"))
+CHANGE_FIELDS = ["last_price", "rolling_mean_30d", "z_score", "is_deal"]
+
+# --- Change Detection ---
+def _same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+def signal_changes(previous: Dict[str, dict], records: Iterable[dict]) -> List[dict]:
+    """
+    Diffs upserted signal records against the rows they replaced. Returns one
+    message per signal that became a deal ("new_deal"), stopped being one
+    ("cleared"), or is still a deal with different values ("updated").
+    Unchanged signals and non-deals that stay non-deals are dropped.
+    """
+    changes = []
+    for record in records:
+        before = previous.get(record["asset_type"])
+        was_deal = bool(before and before.get("is_deal"))
+        is_deal = bool(record.get("is_deal"))
+        if is_deal and not was_deal:
+            change = "new_deal"
+        elif was_deal and not is_deal:
+            change = "cleared"
+        elif is_deal and not all(_same(before.get(f), record.get(f)) for f in CHANGE_FIELDS):
+            change = "updated"
+        else:
+            continue
+        changes.append({**record, "change": change})
+    return changes
+
+# --- Publishing ---
+@functools.lru_cache(maxsize=1)
+def get_publisher():
+    """
+    Batching, ordered Pub/Sub publisher, or None when the client is unavailable.
+    Imported and created on first publish, then reused by warm invocations.
+    """
+    try:
+        from google.cloud import pubsub_v1
+    except ImportError:  # Publishing is disabled without the Pub/Sub client
+        print("google-cloud-pubsub is not installed; signal changes will not be published.")
+        return None
+    return pubsub_v1.PublisherClient(
+        batch_settings=pubsub_v1.types.BatchSettings(
+            max_messages=PUBLISH_MAX_MESSAGES,
+            max_bytes=PUBLISH_MAX_BYTES,
+            max_latency=PUBLISH_MAX_LATENCY,
+        ),
+        publisher_options=pubsub_v1.types.PublisherOptions(enable_message_ordering=True),
+    )
+
+def publish_changes(changes: List[dict], publisher=None, topic: Optional[str] = SIGNALS_TOPIC) -> int:
+    """
+    Publishes signal changes as JSON, ordered per asset type. Messages are
+    batched by the client; this waits for every publish to settle and
+    returns how many succeeded.
+    """
+    if not changes or not topic:
+        return 0
+    publisher = publisher or get_publisher()
+    if publisher is None:
+        return 0
+
+    futures = []
+    for change in changes:
+        data = json.dumps(change, default=str).encode("utf-8")
+        futures.append((change["asset_type"], publisher.publish(topic, data, ordering_key=change["asset_type"])))
+
+    published = 0
+    for asset_type, future in futures:
+        try:
+            future.result(timeout=PUBLISH_TIMEOUT)
+            published += 1
+        except Exception as e:
+            print(f"Failed to publish signal change for {asset_type}: {e}")
+            # An ordering key pauses after a failure until explicitly resumed
+            if hasattr(publisher, "resume_publish"):
+                publisher.resume_publish(topic, asset_type)
+    print(f"Published {published}/{len(changes)} signal changes to {topic}.")
+    return published
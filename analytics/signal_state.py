@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+import pandas as pd
+from sqlalchemy import column, insert, table, text
+
+try:
+    from .signal_engine import ROLLING_WINDOW, parse_window
+except ImportError:  # Loaded as a standalone file by functions-framework
+    from signal_engine import ROLLING_WINDOW, parse_window
+
+# --- Configuration ---
+STATE_TABLE = "signal_state"
+LOOKBACK_DAYS = 35
+SERIES_KEY = "series_key" # asset_type, optionally refined by raw_data fields (e.g. "watch/rolex/116610LN")
+STATE_COLUMNS = ["asset_type", SERIES_KEY, "ingestion_timestamp", "price"]
+STATE_TABLE_CLAUSE = table(STATE_TABLE, *(column(name) for name in STATE_COLUMNS))
+
+# --- Schema ---
+def ensure_state_table(engine):
+    """Creates the rolling-state table if it does not exist yet."""
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+                asset_type TEXT NOT NULL,
+                ingestion_timestamp TIMESTAMPTZ NOT NULL,
+                price DOUBLE PRECISION NOT NULL
+            )
+        """))
+        # Added with composite series keys; older rows fall back to their asset_type
+        connection.execute(text(f"ALTER TABLE {STATE_TABLE} ADD COLUMN IF NOT EXISTS {SERIES_KEY} TEXT"))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {STATE_TABLE}_asset_type_idx ON {STATE_TABLE} (asset_type, ingestion_timestamp)"
+        ))
+
+# --- State Loading ---
+def load_signal_state(engine) -> pd.DataFrame:
+    """
+    Loads the persisted rolling window of every series, sorted the same way
+    as the BigQuery loader sorts.
+    """
+    ensure_state_table(engine)
+    with engine.connect() as connection:
+        state_df = pd.read_sql(
+            text(
+                f"SELECT asset_type, COALESCE({SERIES_KEY}, asset_type) AS {SERIES_KEY}, ingestion_timestamp, price "
+                f"FROM {STATE_TABLE}"
+            ),
+            connection,
+        )
+    state_df['ingestion_timestamp'] = pd.to_datetime(state_df['ingestion_timestamp'], utc=True)
+    state_df.sort_values(by=['asset_type', 'ingestion_timestamp'], inplace=True)
+    return state_df.reset_index(drop=True)
+
+def get_watermark(state_df: pd.DataFrame) -> Optional[datetime]:
+    """Returns the newest ingestion_timestamp covered by the state, if any."""
+    if state_df.empty:
+        return None
+    return state_df['ingestion_timestamp'].max().to_pydatetime()
+
+# --- State Maintenance ---
+def with_series_key(df: pd.DataFrame) -> pd.DataFrame:
+    """Adds the series key column (the asset_type) to frames loaded without one."""
+    if SERIES_KEY in df.columns:
+        return df
+    return df.assign(**{SERIES_KEY: df['asset_type'].astype(str)})
+
+def state_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The state columns with tz-aware timestamps, so concatenating with an empty
+    (object-typed) state never falls back to object columns.
+    """
+    return df[STATE_COLUMNS].assign(ingestion_timestamp=pd.to_datetime(df['ingestion_timestamp'], utc=True))
+
+def merge_state(state_df: pd.DataFrame, new_df: pd.DataFrame, now: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Appends new rows to the stored windows of the series they touch and drops
+    anything that has fallen out of the lookback, so the result is exactly the
+    tail of what a full reload would have seen for those series.
+    """
+    now = now or datetime.now(timezone.utc)
+    state_df, new_df = with_series_key(state_df), with_series_key(new_df)
+    touched = set(map(str, new_df[SERIES_KEY].unique()))
+    combined = pd.concat(
+        [state_columns(state_df.loc[state_df[SERIES_KEY].astype(str).isin(touched)]), state_columns(new_df)],
+        ignore_index=True,
+    )
+    combined = combined[combined['ingestion_timestamp'] >= now - timedelta(days=LOOKBACK_DAYS)]
+    combined = combined.sort_values(by=['asset_type', 'ingestion_timestamp'])
+    return combined.reset_index(drop=True)
+
+def trim_state(df: pd.DataFrame, window=ROLLING_WINDOW) -> pd.DataFrame:
+    """
+    Keeps what later rows can still see: the last `window` observations of
+    every series, or for a time window, the observations within `window` of
+    that series' own newest one. A time window therefore keeps every row of
+    the span per series (about window x daily listings), where a row count
+    keeps a fixed `window` rows.
+    """
+    df, window = with_series_key(df), parse_window(window)
+    if isinstance(window, pd.Timedelta):
+        if df.empty:
+            return df[STATE_COLUMNS]
+        timestamps = pd.to_datetime(df['ingestion_timestamp'], utc=True)
+        newest = timestamps.groupby(df[SERIES_KEY], sort=False, observed=True).transform('max')
+        return df.loc[timestamps > newest - window, STATE_COLUMNS]
+    return df.groupby(SERIES_KEY, sort=False, observed=True).tail(window)[STATE_COLUMNS]
+
+def fold_state(state_df: pd.DataFrame, new_df: pd.DataFrame, window=ROLLING_WINDOW, now: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Appends rows ingested after everything in the state and trims the result,
+    keeping the state of every series, touched or not. Rows only need to be
+    in time order within each series, so nothing is re-sorted.
+    """
+    now = now or datetime.now(timezone.utc)
+    combined = pd.concat([state_columns(with_series_key(state_df)), state_columns(with_series_key(new_df))], ignore_index=True)
+    combined = combined[combined['ingestion_timestamp'] >= now - timedelta(days=LOOKBACK_DAYS)]
+    return trim_state(combined, window).reset_index(drop=True)
+
+def save_state_changes(engine, state_df: pd.DataFrame, watermark: Optional[datetime], window=ROLLING_WINDOW, now: Optional[datetime] = None) -> int:
+    """
+    Persists an incremental run's state by its difference to the stored one:
+    appends the rows ingested after `watermark` and, for each series they
+    belong to, deletes the stored rows older than the oldest row `state_df`
+    kept. One more DELETE expires rows of every series, including those
+    without new rows: rows past the lookback and, for a time window, rows
+    older than `window` before the newest row, which no later row can see.
+    Series that stop receiving rows under a row-count window already hold at
+    most `window` rows, so the lookback bounds them. Costs O(new rows +
+    touched series + expired rows) rather than O(window).
+    Returns the number of rows appended.
+    """
+    if watermark is None:
+        save_signal_state(engine, state_df)
+        return len(state_df)
+    ensure_state_table(engine)
+    now, window = now or datetime.now(timezone.utc), parse_window(window)
+    state_df = with_series_key(state_df)[STATE_COLUMNS].astype({'asset_type': str, SERIES_KEY: str})
+    state_df['ingestion_timestamp'] = pd.to_datetime(state_df['ingestion_timestamp'], utc=True)
+    new_rows = state_df[state_df['ingestion_timestamp'] > pd.Timestamp(watermark)]
+    touched = state_df[state_df[SERIES_KEY].isin(new_rows[SERIES_KEY].unique())]
+    cutoffs = touched.groupby([SERIES_KEY, 'asset_type'])['ingestion_timestamp'].min().rename('cutoff').reset_index()
+    cutoffs = cutoffs.to_dict(orient='records')
+    rows = new_rows.to_dict(orient='records')
+    expired = pd.Timestamp(now) - timedelta(days=LOOKBACK_DAYS)
+    if isinstance(window, pd.Timedelta) and not state_df.empty:
+        expired = max(expired, state_df['ingestion_timestamp'].max() - window)
+    with engine.begin() as connection:
+        if cutoffs:
+            connection.execute(
+                text(
+                    f"DELETE FROM {STATE_TABLE} WHERE asset_type = :asset_type "
+                    f"AND COALESCE({SERIES_KEY}, asset_type) = :{SERIES_KEY} AND ingestion_timestamp < :cutoff"
+                ),
+                cutoffs,
+            )
+        pruned = connection.execute(
+            text(f"DELETE FROM {STATE_TABLE} WHERE ingestion_timestamp < :expired"), {"expired": expired}
+        ).rowcount
+        if rows:
+            connection.execute(insert(STATE_TABLE_CLAUSE), rows)
+    print(f"Saved rolling state: {len(rows)} rows appended, {len(cutoffs)} series trimmed, {pruned} expired rows pruned.")
+    return len(rows)
+
+def save_signal_state(engine, state_df: pd.DataFrame, asset_types: Optional[Iterable[str]] = None):
+    """
+    Replaces the stored windows of `asset_types` (all series when None) with
+    the rows in `state_df`, in a single transaction.
+    """
+    ensure_state_table(engine)
+    rows = state_df[STATE_COLUMNS].to_dict(orient='records')
+    with engine.begin() as connection:
+        if asset_types is None:
+            connection.execute(text(f"DELETE FROM {STATE_TABLE}"))
+        else:
+            connection.execute(
+                text(f"DELETE FROM {STATE_TABLE} WHERE asset_type = ANY(:asset_types)"),
+                {"asset_types": list(asset_types)},
+            )
+        if rows:
+            # Core insert() so the driver batches rows into multi-VALUES statements
+            connection.execute(insert(STATE_TABLE_CLAUSE), rows)
+    print(f"Saved rolling state: {len(rows)} rows.")
@@ -0,0 +1,100 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analytics.calculate_signals import batch_to_frame
+from analytics.listings_cache import (
+    cached_watermark,
+    list_partitions,
+    read_cache,
+    refresh_cache,
+)
+
+
+def make_rows(start: datetime, days: int, asset_type: str = 'watch') -> pd.DataFrame:
+    return pd.DataFrame({
+        'asset_type': [asset_type] * days,
+        'ingestion_timestamp': [start + timedelta(days=x) for x in range(days)],
+        'price': [100.0 + x for x in range(days)],
+    })
+
+@pytest.fixture
+def now() -> datetime:
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+def test_refresh_fetches_only_after_watermark(tmp_path, now):
+    """Test that a second refresh only asks for rows newer than the cache."""
+    cache_dir = str(tmp_path)
+    calls = []
+
+    def fetch(since):
+        calls.append(since)
+        return [make_rows(now - timedelta(days=10), 5)] if since is None else []
+
+    assert refresh_cache(cache_dir, fetch) == 5
+    assert refresh_cache(cache_dir, fetch) == 0
+    assert calls[0] is None
+    assert calls[1] == now - timedelta(days=6)
+    assert cached_watermark(cache_dir) == now - timedelta(days=6)
+
+def test_old_partitions_are_evicted(tmp_path, now):
+    """Test that partitions older than the lookback are removed on refresh."""
+    cache_dir = str(tmp_path)
+    refresh_cache(cache_dir, lambda since: [make_rows(now - timedelta(days=40), 10)])
+    oldest_day = min(day for day, _ in list_partitions(cache_dir))
+    assert oldest_day >= (now - timedelta(days=35)).date()
+
+def test_read_cache_returns_sorted_window(tmp_path, now):
+    """Test that the cached window reads back sorted by asset type and time."""
+    cache_dir = str(tmp_path)
+    rows = pd.concat([make_rows(now - timedelta(days=5), 3, 'wine'), make_rows(now - timedelta(days=5), 3)])
+    refresh_cache(cache_dir, lambda since: [rows])
+
+    df = read_cache(cache_dir)
+    assert len(df) == 6
+    assert list(df['asset_type'].astype(str)) == ['watch'] * 3 + ['wine'] * 3
+    assert df.groupby('asset_type', observed=True)['ingestion_timestamp'].is_monotonic_increasing.all()
+
+def test_multi_field_series_round_trip(tmp_path, now):
+    """Test that series keys built from several fields survive a trip through the cache."""
+    cache_dir = str(tmp_path)
+    batch = pa.RecordBatch.from_pydict({
+        'asset_type': ['watch', 'watch', 'watch'],
+        'brand': ['rolex', 'rolex', 'omega'],
+        'model': ['116610LN', '126610LV', None],
+        'ingestion_timestamp': [now - timedelta(days=3), now - timedelta(days=2), now - timedelta(days=1)],
+        'price': [100.0, 200.0, 300.0],
+    })
+    frame = batch_to_frame(batch, series_fields=['brand', 'model'])
+    refresh_cache(cache_dir, lambda since: [frame] if since is None else [], series_fields=['brand', 'model'])
+
+    df = read_cache(cache_dir)
+    assert list(df['series_key'].astype(str)) == ['watch/rolex/116610LN', 'watch/rolex/126610LV', 'watch/omega/']
+    assert list(df['series_key'].astype(str)) == list(frame['series_key'].astype(str))
+
+def test_cache_in_another_layout_is_invalidated(tmp_path, now):
+    """Test that partitions written without series keys, or for other series fields, are dropped on refresh."""
+    cache_dir = str(tmp_path)
+    old_partition = tmp_path / f"date={(now - timedelta(days=2)).date().isoformat()}"
+    old_partition.mkdir()
+    pq.write_table(pa.Table.from_pandas(make_rows(now - timedelta(days=2), 1), preserve_index=False), old_partition / "part-0.parquet")
+
+    calls = []
+    def fetch(since):
+        calls.append(since)
+        return [make_rows(now - timedelta(days=1), 1)] if since is None else []
+
+    refresh_cache(cache_dir, fetch)
+    assert calls == [None]
+    assert list(read_cache(cache_dir)['series_key'].astype(str)) == ['watch']
+
+    refresh_cache(cache_dir, fetch, series_fields=['brand'])
+    assert calls == [None, None]
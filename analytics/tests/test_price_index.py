@@ -0,0 +1,76 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analytics.price_index import (
+    INDEX_BASE,
+    INDEX_COLUMNS,
+    DailyAggregator,
+    chain_indices,
+    index_name,
+    index_watermarks,
+)
+
+
+def make_batch(rows) -> pd.DataFrame:
+    return pd.DataFrame({
+        'asset_type': [asset_type for asset_type, _, _ in rows],
+        'ingestion_timestamp': [datetime(2023, 10, day, 12, tzinfo=timezone.utc) for _, day, _ in rows],
+        'price': [price for _, _, price in rows],
+    })
+
+def aggregate(*batches, since=None) -> pd.DataFrame:
+    daily = DailyAggregator(since)
+    assert list(daily.observe(batches)) == list(batches)
+    return daily.frame()
+
+def test_index_name():
+    """Test that asset types map to CamelCase index names."""
+    assert index_name('watch') == 'WatchIndex'
+    assert index_name('private_jet') == 'PrivateJetIndex'
+
+def test_chain_indices_from_scratch():
+    """Test that the index starts at the base and follows the ratio of daily means."""
+    aggregates = aggregate(
+        make_batch([('watch', 1, 100.0), ('watch', 1, 300.0), ('watch', 2, 300.0)]),
+        make_batch([('watch', 3, 150.0), ('wine', 1, 50.0)]),
+    )
+    indices = chain_indices(pd.DataFrame(columns=INDEX_COLUMNS), aggregates).set_index('asset_type')
+
+    # Daily means 200 -> 300 -> 150
+    assert indices.loc['watch', 'value'] == pytest.approx(INDEX_BASE * 1.5 * 0.5)
+    assert indices.loc['watch', 'name'] == 'WatchIndex'
+    assert indices.loc['wine', 'value'] == INDEX_BASE
+
+def test_chain_indices_incremental_matches_full():
+    """Test that folding runs one at a time, including a day split across runs, matches a single pass."""
+    first = make_batch([('watch', 1, 100.0), ('watch', 2, 200.0)])
+    second = make_batch([('watch', 2, 400.0), ('watch', 3, 150.0)])
+
+    full = chain_indices(pd.DataFrame(columns=INDEX_COLUMNS), aggregate(first, second))
+    state = chain_indices(pd.DataFrame(columns=INDEX_COLUMNS), aggregate(first))
+    incremental = chain_indices(state, aggregate(second))
+
+    assert incremental['value'].iloc[0] == pytest.approx(full['value'].iloc[0])
+    assert incremental['day_count'].iloc[0] == 1
+
+def test_rerun_does_not_fold_rows_twice():
+    """Test that rows already folded into the index are skipped when a later run sees them again."""
+    first = make_batch([('watch', 1, 100.0), ('watch', 2, 200.0)])
+    second = make_batch([('watch', 2, 400.0), ('watch', 3, 150.0)])
+    third = make_batch([('watch', 4, 300.0)])
+    state = chain_indices(pd.DataFrame(columns=INDEX_COLUMNS), aggregate(first))
+    once = chain_indices(state, aggregate(second, since=index_watermarks(state)))
+    assert once['watermark'].iloc[0] == datetime(2023, 10, 3, 12, tzinfo=timezone.utc)
+
+    # The signal state did not advance after `second`, so the next run reloads it
+    assert aggregate(first, second, since=index_watermarks(once)).empty
+    rerun = chain_indices(once, aggregate(second, third, since=index_watermarks(once)))
+    expected = chain_indices(once, aggregate(third))
+    assert rerun.to_dict(orient='records') == expected.to_dict(orient='records')
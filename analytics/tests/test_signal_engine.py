@@ -0,0 +1,104 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analytics.signal_engine import compute_rolling_signals, group_layout, shard_bounds
+
+
+def reference_signals(df: pd.DataFrame) -> pd.DataFrame:
+    """The original per-group lambda implementation, kept as the oracle."""
+    df = df.copy()
+    df['rolling_mean_30d'] = df.groupby('asset_type')['price'].transform(
+        lambda x: x.rolling(window=30, min_periods=5).mean()
+    )
+    df['rolling_std_30d'] = df.groupby('asset_type')['price'].transform(
+        lambda x: x.rolling(window=30, min_periods=5).std()
+    )
+    df['z_score'] = (df['price'] - df['rolling_mean_30d']) / df['rolling_std_30d']
+    df['discount_signal'] = df['price'] <= (df['rolling_mean_30d'] * 0.9)
+    df['z_score_signal'] = df['z_score'] <= -2.0
+    df['is_deal'] = df['discount_signal'] | df['z_score_signal']
+    return df
+
+
+@pytest.fixture
+def random_data() -> pd.DataFrame:
+    """Interleaved, unsorted groups of varying length with a few missing prices."""
+    rng = np.random.default_rng(42)
+    n = 5000
+    df = pd.DataFrame({
+        'asset_type': rng.choice([f'model_{i}' for i in range(40)], size=n),
+        'ingestion_timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 35 * 86400, size=n), unit='s'),
+        'price': rng.lognormal(mean=8, sigma=0.3, size=n),
+    })
+    df.loc[rng.choice(n, size=50, replace=False), 'price'] = np.nan
+    return df
+
+def test_matches_reference_implementation(random_data):
+    """Test that the vectorized engine reproduces the pandas rolling results."""
+    expected = reference_signals(random_data)
+    result = compute_rolling_signals(random_data.copy())
+
+    for column in ['rolling_mean_30d', 'rolling_std_30d', 'z_score']:
+        np.testing.assert_allclose(result[column], expected[column], rtol=1e-9, equal_nan=True)
+    for column in ['discount_signal', 'z_score_signal', 'is_deal']:
+        assert (result[column] == expected[column]).all()
+
+def test_parallel_shards_match_single_pass(random_data):
+    """Test that sharding series across worker processes gives the same statistics."""
+    expected = compute_rolling_signals(random_data.copy())
+    result = compute_rolling_signals(random_data.copy(), workers=2, shard_rows=700)
+
+    for column in ['rolling_mean_30d', 'rolling_std_30d', 'z_score']:
+        np.testing.assert_allclose(result[column], expected[column], rtol=1e-12, equal_nan=True)
+
+def test_shards_never_split_a_series(random_data):
+    """Test that shard boundaries fall on series boundaries and cover every row."""
+    _, codes, starts = group_layout(random_data['asset_type'])
+    bounds = shard_bounds(starts, 700)
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(codes)
+    for (_, hi), (lo, _) in zip(bounds, bounds[1:], strict=False):
+        assert hi == lo
+        assert codes[lo] != codes[lo - 1]
+
+def test_time_window_matches_pandas_offset_rolling(random_data):
+    """Test that a time window reproduces pandas' time-based rolling per series."""
+    result = compute_rolling_signals(random_data.copy(), window='2D')
+
+    ordered = random_data.sort_values('ingestion_timestamp', kind='stable')
+    expected = ordered.groupby('asset_type', group_keys=False)[['ingestion_timestamp', 'price']].apply(
+        lambda g: g.rolling('2D', on='ingestion_timestamp', min_periods=5)['price'].mean()
+    ).reindex(random_data.index)
+    np.testing.assert_allclose(result['rolling_mean_30d'], expected, rtol=1e-9, equal_nan=True)
+
+def test_composite_keys_split_series():
+    """Test that a composite key compares each listing with its own sub-series only."""
+    df = pd.DataFrame({
+        'asset_type': ['watch'] * 12,
+        'brand': ['rolex', 'casio'] * 6,
+        'price': [10000.0, 50.0] * 6,
+    })
+    by_type = compute_rolling_signals(df.copy())
+    by_brand = compute_rolling_signals(df.copy(), group_col=['asset_type', 'brand'])
+    assert by_type['is_deal'].any()
+    assert not by_brand['is_deal'].any()
+    assert by_brand.loc[df['brand'] == 'casio', 'rolling_mean_30d'].dropna().eq(50.0).all()
+
+def test_short_series_have_no_stats():
+    """Test that series below min_periods produce NaN statistics and no deal."""
+    df = pd.DataFrame({'asset_type': ['wine'] * 4, 'price': [10.0, 11.0, 12.0, 1.0]})
+    result = compute_rolling_signals(df)
+    assert result['rolling_mean_30d'].isna().all()
+    assert not result['is_deal'].any()
+
+def test_missing_asset_type_is_ungrouped():
+    """Test that rows without an asset_type get no statistics, as with groupby."""
+    df = pd.DataFrame({'asset_type': [None] * 6, 'price': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]})
+    result = compute_rolling_signals(df)
+    assert result['rolling_mean_30d'].isna().all()
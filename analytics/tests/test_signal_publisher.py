@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+from concurrent.futures import Future
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analytics.signal_publisher import publish_changes, signal_changes
+
+
+class FakePublisher:
+    """In-memory stand-in for pubsub_v1.PublisherClient."""
+
+    def __init__(self, fail_keys=()):
+        self.messages = []
+        self.resumed = []
+        self.fail_keys = set(fail_keys)
+
+    def publish(self, topic, data, ordering_key=""):
+        future = Future()
+        if ordering_key in self.fail_keys:
+            future.set_exception(RuntimeError("publish failed"))
+        else:
+            self.messages.append((topic, json.loads(data), ordering_key))
+            future.set_result(str(len(self.messages)))
+        return future
+
+    def resume_publish(self, topic, ordering_key):
+        self.resumed.append(ordering_key)
+
+
+def record(asset_type, price, is_deal, z_score=-2.5):
+    return {"asset_type": asset_type, "last_price": price, "rolling_mean_30d": 100.0, "z_score": z_score, "is_deal": is_deal}
+
+def test_signal_changes_only_reports_transitions_and_changed_deals():
+    """Test that only new, cleared and changed deals are reported."""
+    previous = {
+        "watch": record("watch", 80.0, True),
+        "wine": record("wine", 50.0, True),
+        "jet": record("jet", 90.0, True),
+        "car": record("car", 100.0, False, z_score=0.1),
+    }
+    records = [
+        record("watch", 80.0, True),              # unchanged deal
+        record("wine", 45.0, True),               # cheaper deal
+        record("jet", 100.0, False, z_score=0.0), # no longer a deal
+        record("car", 101.0, False, z_score=0.2), # still not a deal
+        record("art", 10.0, True),                # first seen as a deal
+    ]
+    changes = {change["asset_type"]: change["change"] for change in signal_changes(previous, records)}
+    assert changes == {"wine": "updated", "jet": "cleared", "art": "new_deal"}
+
+def test_publish_changes_uses_asset_type_ordering_keys():
+    """Test that each change is published as JSON with its asset type as ordering key."""
+    publisher = FakePublisher()
+    changes = signal_changes({}, [record("watch", 80.0, True), record("wine", 45.0, True)])
+    assert publish_changes(changes, publisher, topic="projects/p/topics/signals.new") == 2
+    assert [(m["asset_type"], key) for _, m, key in publisher.messages] == [("watch", "watch"), ("wine", "wine")]
+    assert publisher.messages[0][1]["change"] == "new_deal"
+
+def test_publish_changes_resumes_failed_ordering_keys():
+    """Test that a failed publish is counted out and its ordering key resumed."""
+    publisher = FakePublisher(fail_keys={"wine"})
+    changes = signal_changes({}, [record("watch", 80.0, True), record("wine", 45.0, True)])
+    assert publish_changes(changes, publisher, topic="projects/p/topics/signals.new") == 1
+    assert publisher.resumed == ["wine"]
+
+def test_publish_changes_disabled_without_topic():
+    """Test that nothing is published when no topic is configured."""
+    publisher = FakePublisher()
+    assert publish_changes(signal_changes({}, [record("watch", 80.0, True)]), publisher, topic="") == 0
+    assert publisher.messages == []
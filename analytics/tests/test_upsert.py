@@ -0,0 +1,142 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+from sqlalchemy.dialects import postgresql
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analytics import calculate_signals as calculate_signals_module
+from analytics.calculate_signals import (
+    _upsert_copy,
+    _upsert_values,
+    upsert_signals_to_postgres,
+)
+
+PREVIOUS = [("watch", 100.0, 120.0, -2.5, True), ("wine", 50.0, 55.0, -0.5, False)]
+
+
+@pytest.fixture
+def signals_df() -> pd.DataFrame:
+    return pd.DataFrame({
+        'asset_type': ['watch', 'wine', 'art'],
+        'price': [90.0, 40.0, 10.0],
+        'rolling_mean_30d': [120.0, 55.0, 20.0],
+        'z_score': [-3.0, -2.2, float('nan')],
+        'is_deal': [True, True, False],
+    })
+
+class RecordingConnection:
+    """Stands in for a SQLAlchemy connection and records every statement."""
+
+    def __init__(self):
+        self.statements = []
+
+    def exec_driver_sql(self, sql, params):
+        self.statements.append((sql, params))
+        return PREVIOUS
+
+    def execution_options(self, **options):
+        self.options = options
+        return self
+
+    def execute(self, stmt, params):
+        self.statements.append((str(stmt.compile(dialect=postgresql.dialect())), params))
+
+class RecordingEngine:
+    def __init__(self):
+        self.connection = RecordingConnection()
+
+    @contextmanager
+    def begin(self):
+        yield self.connection
+
+class RecordingCursor:
+    """Stands in for a psycopg2 cursor; keeps the CSV sent to each COPY."""
+
+    def __init__(self):
+        self.executed = []
+        self.copied = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append(" ".join(sql.split()))
+
+    def fetchall(self):
+        return PREVIOUS
+
+    def copy_expert(self, sql, buffer):
+        self.copied.append((sql, buffer.read()))
+
+class RecordingRawConnection:
+    def __init__(self):
+        self.cursor_ = RecordingCursor()
+        self.committed = self.closed = False
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def test_values_upsert_batches_rows_with_history(signals_df):
+    """Test that the VALUES path sends one ON CONFLICT upsert and one history insert per batch."""
+    engine = RecordingEngine()
+    changes = _upsert_values(signals_df, engine, batch_size=2)
+
+    statements = engine.connection.statements
+    assert "FOR UPDATE" in statements[0][0]
+    upserts = [(sql, params) for sql, params in statements[1:] if "ON CONFLICT (asset_type) DO UPDATE" in sql]
+    history = [(sql, params) for sql, params in statements[1:] if "INSERT INTO signal_history" in sql]
+    assert [len(params) for _, params in upserts] == [2, 1]
+    assert [len(params) for _, params in history] == [2, 1]
+    assert engine.connection.options == {"insertmanyvalues_page_size": 2}
+    assert upserts[1][1] == [{"asset_type": "art", "last_price": 10.0, "rolling_mean_30d": 20.0, "z_score": None, "is_deal": False}]
+    assert {change["asset_type"]: change["change"] for change in changes} == {"watch": "updated", "wine": "new_deal"}
+
+def test_copy_upsert_stages_csv_batches(signals_df):
+    """Test that the COPY path streams CSV batches into staging and merges them in one transaction."""
+    raw_connection = RecordingRawConnection()
+    engine = type("Engine", (), {"raw_connection": lambda self: raw_connection})()
+    changes = _upsert_copy(signals_df, engine, batch_size=2)
+
+    cursor = raw_connection.cursor_
+    assert [sql for sql, _ in cursor.copied] == [
+        "COPY signals_staging (asset_type, last_price, rolling_mean_30d, z_score, is_deal) FROM STDIN WITH (FORMAT csv)"
+    ] * 2
+    assert [csv for _, csv in cursor.copied] == ["watch,90.0,120.0,-3.0,True\nwine,40.0,55.0,-2.2,True\n", "art,10.0,20.0,,False\n"]
+    assert any(sql.startswith("INSERT INTO signals") and "ON CONFLICT (asset_type)" in sql for sql in cursor.executed)
+    assert any(sql.startswith("INSERT INTO signal_history") for sql in cursor.executed)
+    assert raw_connection.committed and raw_connection.closed
+    assert {change["asset_type"] for change in changes} == {"watch", "wine"}
+
+def test_upsert_method_comes_from_configuration(signals_df, monkeypatch):
+    """Test that UPSERT_METHOD picks the writer when no method is passed, and unknown methods are rejected."""
+    calls = []
+    monkeypatch.setattr(calculate_signals_module, "ensure_history_table", lambda engine: None)
+    monkeypatch.setattr(calculate_signals_module, "notify_signals_changed", lambda engine: None)
+    monkeypatch.setattr(calculate_signals_module, "_upsert_values", lambda df, engine, batch_size: calls.append("values") or [])
+    monkeypatch.setattr(calculate_signals_module, "_upsert_copy", lambda df, engine, batch_size: calls.append("copy") or [])
+
+    monkeypatch.setattr(calculate_signals_module, "UPSERT_METHOD", "copy")
+    upsert_signals_to_postgres(signals_df, engine=None)
+    upsert_signals_to_postgres(signals_df, engine=None, method="values")
+    assert calls == ["copy", "values"]
+
+    monkeypatch.setattr(calculate_signals_module, "UPSERT_METHOD", "merge")
+    with pytest.raises(ValueError):
+        upsert_signals_to_postgres(signals_df, engine=None)
@@ -1,24 +1,196 @@
-from datetime import datetime
-from typing import List
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
 
 import uvicorn
-from fastapi import Depends, FastAPI, HTTPException
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+
+from common import instrumentation
 
 # It's good practice to have database session management in a separate file.
 from . import database
-from .database import SessionLocal
+from .cache import (
+    ResponseCache,
+    VersionTracker,
+    as_utc,
+    cache_key,
+    cached_response,
+    listen_for_changes,
+)
+from .database import AsyncSessionLocal
+from .export import (
+    EXPORT_CHUNK_ROWS,
+    SCHEMAS,
+    ExportEncoder,
+    UnsupportedFormat,
+    build_export_query,
+    negotiate_format,
+)
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+from .series import (
+    BUCKETS_QUERY,
+    DEFAULT_POINTS,
+    DEFAULT_RANGE,
+    LTTB_OVERSAMPLE,
+    MAX_POINTS,
+    bucket_params,
+    bucket_time,
+    lttb,
+)
+from .stream import (
+    SignalHub,
+    Subscriber,
+    TooManySubscribers,
+    decode_event_id,
+    stream_events,
+)
 
 # Create all tables in the database.
 # This is okay for development, but for production, you might want to use Alembic for migrations.
 # models.Base.metadata.create_all(bind=engine)
 
+# --- Response Cache ---
+# Signals only change when the analytics job runs, so serialized responses are
+# reused until max(updated_at) moves or the job NOTIFYs us.
+response_cache = ResponseCache()
+signals_version = VersionTracker()
+indices_version = VersionTracker()
+
+def invalidate_cache():
+    signals_version.invalidate()
+    indices_version.invalidate()
+    response_cache.clear()
+
+# --- Signal Stream ---
+# One hub per instance reads changed rows once per NOTIFY and fans them out to
+# every /signals/stream client.
+SIGNAL_CHANGES_QUERY = database.text(
+    "SELECT asset_type, last_price, rolling_mean_30d, z_score, is_deal, updated_at "
+    "FROM signals WHERE updated_at >= :since"
+)
+ALL_SIGNALS_QUERY = database.text(
+    "SELECT asset_type, last_price, rolling_mean_30d, z_score, is_deal, updated_at FROM signals"
+)
+
+async def fetch_signal_changes(since: Optional[datetime]) -> List[dict]:
+    async with AsyncSessionLocal() as db:
+        if since is None:
+            rows = (await db.execute(ALL_SIGNALS_QUERY)).mappings().all()
+        else:
+            rows = (await db.execute(SIGNAL_CHANGES_QUERY, {"since": since})).mappings().all()
+    return [{**row, "updated_at": as_utc(row["updated_at"])} for row in rows]
+
+signal_hub = SignalHub(fetch_signal_changes)
+
+def on_signals_changed():
+    invalidate_cache()
+    signal_hub.notify()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener = None
+    try:
+        listener = await listen_for_changes(database.to_libpq_dsn(database.POSTGRES_DB_URL), on_signals_changed)
+    except Exception as e:
+        print(f"Change listener unavailable, relying on version checks: {e}")
+    try:
+        await signal_hub.refresh()
+    except Exception as e:
+        print(f"Signal stream snapshot unavailable, loading it on the first subscriber: {e}")
+    hub_task = asyncio.create_task(signal_hub.run())
+    yield
+    hub_task.cancel()
+    if listener is not None:
+        await listener.close()
+    # Close pooled connections cleanly on shutdown
+    await database.async_engine.dispose()
+
 app = FastAPI(
     title="CALIF API",
     description="Provides access to cross-asset luxury investment signals and indices.",
     version="1.0.0",
+    lifespan=lifespan,
+)
+
+# --- Instrumentation ---
+PROFILE_HEADER = "x-calif-profile" # with PROFILE_MODE=request, "1" profiles that request
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Times every request as an invocation labelled with its route template and status."""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    profile = request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes")
+    with instrumentation.invocation("api_request", profile=profile, method=request.method) as invocation:
+        try:
+            response = await call_next(request)
+        finally:
+            # The matched route is only known once routing ran; unmatched paths share one label
+            route = request.scope.get("route")
+            invocation.labels["route"] = getattr(route, "path", "unmatched")
+        invocation.labels["status_code"] = response.status_code
+        return response
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of this instance's counters and latency histograms."""
+    return Response(instrumentation.render_prometheus(), media_type=instrumentation.PROMETHEUS_CONTENT_TYPE)
+
+# --- Queries ---
+SIGNALS_QUERY = database.text(
+    "SELECT asset_type, last_price, rolling_mean_30d, z_score, is_deal, updated_at "
+    "FROM signals WHERE is_deal = :is_deal ORDER BY updated_at DESC"
 )
+SIGNALS_VERSION_QUERY = database.text("SELECT max(updated_at) FROM signals")
+INDICES_QUERY = database.text("SELECT name, value, updated_at FROM indices ORDER BY name")
+INDICES_VERSION_QUERY = database.text("SELECT max(updated_at) FROM indices")
+
+def build_history_query(
+    asset_type: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    is_deal: Optional[bool],
+    max_z_score: Optional[float],
+    cursor: Optional[tuple],
+    limit: int,
+):
+    """
+    Builds a keyset-paginated query over signal_history, newest first.
+    Only the filters that are set appear in the WHERE clause, so Postgres can
+    walk the (asset_type, updated_at, id) or (updated_at, id) index directly.
+    Bounds without an offset are taken as UTC, as on /signals/series.
+    """
+    clauses, params = [], {"limit": limit + 1}
+    if asset_type is not None:
+        clauses.append("asset_type = :asset_type")
+        params["asset_type"] = asset_type
+    if start is not None:
+        clauses.append("updated_at >= :start")
+        params["start"] = as_utc(start)
+    if end is not None:
+        clauses.append("updated_at < :end")
+        params["end"] = as_utc(end)
+    if is_deal is not None:
+        clauses.append("is_deal = :is_deal")
+        params["is_deal"] = is_deal
+    if max_z_score is not None:
+        clauses.append("z_score <= :max_z_score")
+        params["max_z_score"] = max_z_score
+    if cursor is not None:
+        clauses.append("(updated_at, id) < (:cursor_updated_at, :cursor_id)")
+        params["cursor_updated_at"], params["cursor_id"] = cursor
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = database.text(
+        "SELECT id, asset_type, last_price, rolling_mean_30d, z_score, is_deal, updated_at "
+        f"FROM signal_history {where} ORDER BY updated_at DESC, id DESC LIMIT :limit"
+    )
+    return query, params
 
 # --- Pydantic Models ---
 
@@ -33,9 +205,20 @@ class Signal(BaseModel):
     class Config:
         orm_mode = True
 
+class SignalHistoryItem(BaseModel):
+    id: int
+    asset_type: str
+    last_price: Optional[float]
+    rolling_mean_30d: Optional[float]
+    z_score: Optional[float]
+    is_deal: Optional[bool]
+    updated_at: datetime
+
+class SignalHistoryPage(BaseModel):
+    items: List[SignalHistoryItem]
+    next_cursor: Optional[str] = None
+
 class Index(BaseModel):
-    # Define your Index model here based on your database schema
-    # For example:
     name: str
     value: float
     updated_at: datetime
@@ -43,48 +226,281 @@ class Index(BaseModel):
     class Config:
         orm_mode = True
 
+class SeriesPoint(BaseModel):
+    t: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    mean: float
+    count: int
+
+class Series(BaseModel):
+    asset_type: str
+    start: datetime
+    end: datetime
+    method: str
+    bucket_seconds: float
+    points: List[SeriesPoint]
+
+SIGNALS_ADAPTER = TypeAdapter(List[Signal])
+HISTORY_PAGE_ADAPTER = TypeAdapter(SignalHistoryPage)
+SERIES_ADAPTER = TypeAdapter(Series)
+INDICES_ADAPTER = TypeAdapter(List[Index])
+
 # --- Dependency ---
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to the CALIF API"}
 
+async def current_signals_version(db: AsyncSession):
+    """Latest signals update time, re-read at most every VERSION_CHECK_INTERVAL seconds."""
+    return await signals_version.current(lambda: db.scalar(SIGNALS_VERSION_QUERY))
+
 @app.get("/signals", response_model=List[Signal])
-def get_signals(db: Session = Depends(get_db)):  # noqa: B008
+async def get_signals(request: Request, db: AsyncSession = Depends(get_db)):  # noqa: B008
     """
     Retrieve all the latest deal signals from the database.
+    Responses are cached and support ETag / Last-Modified conditional requests.
     """
     # This assumes you have a 'signals' table and a corresponding SQLAlchemy model.
     # We will use raw SQL for now as we don't have the model defined.
     try:
-        query = "SELECT asset_type, last_price, rolling_mean_30d, z_score, is_deal, updated_at FROM signals WHERE is_deal = TRUE ORDER BY updated_at DESC"
-        results = db.execute(database.text(query)).fetchall()
-        return results
+        version = await current_signals_version(db)
+        key = cache_key(request)
+        entry = response_cache.get(key, version)
+        if entry is None:
+            results = await db.execute(SIGNALS_QUERY, {"is_deal": True})
+            signals = SIGNALS_ADAPTER.validate_python(results.mappings().all(), from_attributes=True)
+            entry = response_cache.put(key, SIGNALS_ADAPTER.dump_json(signals), version, last_modified=version)
+        return cached_response(request, entry)
     except Exception as e:
         # This will catch issues like "relation 'signals' does not exist" if the table isn't created.
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
-@app.get("/index", response_model=List[Index])
-def get_index(db: Session = Depends(get_db)):  # noqa: B008
-    """
-    Retrieve the computed indices.
-    (This is a placeholder and needs a corresponding table and logic).
-    """
-    # This endpoint is a placeholder. To implement it, you would:
-    # 1. Have a service that calculates indices and stores them in a table (e.g., 'indices').
-    # 2. Query that table here.
-    # For now, it returns a hardcoded example.
-    return [
-        {"name": "WatchIndex", "value": 1234.56, "updated_at": datetime.utcnow()},
-        {"name": "WineIndex", "value": 7890.12, "updated_at": datetime.utcnow()},
+@app.get("/signals/history", response_model=SignalHistoryPage)
+async def get_signal_history(
+    request: Request,
+    asset_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    is_deal: Optional[bool] = None,
+    max_z_score: Optional[float] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+):
+    """
+    Page through past signals, newest first. Pass the returned `next_cursor`
+    back as `cursor` to fetch the next page; each page costs the same
+    regardless of how deep it is.
+    """
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    try:
+        version = await current_signals_version(db)
+        key = cache_key(request)
+        entry = response_cache.get(key, version)
+        if entry is None:
+            query, params = build_history_query(asset_type, start, end, is_deal, max_z_score, position, limit)
+            rows = (await db.execute(query, params)).mappings().all()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+            page = SignalHistoryPage(items=[dict(row) for row in rows], next_cursor=next_cursor)
+            entry = response_cache.put(key, HISTORY_PAGE_ADAPTER.dump_json(page), version, last_modified=version)
+        return cached_response(request, entry)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+def build_series(asset_type: str, start: datetime, end: datetime, rows, method: str, points: int, width: float) -> Series:
+    """
+    Turns bucket rows into series points. For "lttb", the oversampled buckets
+    are reduced to `points` with Largest-Triangle-Three-Buckets on their means.
+    """
+    series_points = [
+        SeriesPoint(t=bucket_time(start, width, row["bucket"]), **{k: row[k] for k in ("open", "high", "low", "close", "mean", "count")})
+        for row in rows
     ]
+    if method == "lttb":
+        kept = lttb([(point.t.timestamp(), point.mean) for point in series_points], points)
+        series_points = [series_points[i] for i in kept]
+    return Series(asset_type=asset_type, start=start, end=end, method=method, bucket_seconds=width, points=series_points)
+
+
+@app.get("/signals/series", response_model=Series)
+async def get_signal_series(
+    request: Request,
+    asset_type: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(DEFAULT_POINTS, ge=3, le=MAX_POINTS),
+    method: Literal["buckets", "lttb"] = "buckets",
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+):
+    """
+    Downsampled price series for one asset type over [start, end), at most
+    `points` points (e.g. the chart width in pixels). Each point is a time
+    bucket with OHLC, mean and count aggregated in SQL, so the payload and
+    latency track the point budget rather than the amount of history.
+    """
+    # Timestamps without an offset are taken as UTC, so they compare with the default end
+    end = as_utc(end) or datetime.now(timezone.utc)
+    start = as_utc(start) or end - DEFAULT_RANGE
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    try:
+        version = await current_signals_version(db)
+        key = cache_key(request)
+        entry = response_cache.get(key, version)
+        if entry is None:
+            buckets = points * LTTB_OVERSAMPLE if method == "lttb" else points
+            params = bucket_params(asset_type, start, end, buckets)
+            rows = (await db.execute(BUCKETS_QUERY, params)).mappings().all()
+            series = build_series(asset_type, start, end, rows, method, points, params["width"])
+            entry = response_cache.put(key, SERIES_ADAPTER.dump_json(series), version, last_modified=version)
+        return cached_response(request, entry)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.get("/export/{dataset}")
+async def export_signals(
+    request: Request,
+    dataset: Literal["signals", "history"],
+    format: Optional[Literal["arrow", "parquet", "ndjson"]] = None,
+    compression: Optional[str] = None,
+    asset_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """
+    Stream a whole table (or a filtered slice of history) in one response.
+    The format is taken from `format` or negotiated from the Accept header:
+    Arrow IPC stream, Parquet or NDJSON, each with optional `compression`.
+    Rows come off a server-side cursor EXPORT_CHUNK_ROWS at a time and are
+    encoded chunk by chunk, so memory stays flat however large the export is.
+    Exports are not cached.
+    """
+    try:
+        export_format = negotiate_format(request.headers.get("accept"), format)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=406, detail=str(e)) from e
+    try:
+        encoder = ExportEncoder(export_format, SCHEMAS[dataset], compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    # The session has to outlive this handler, so it is closed by the body generator, not a dependency
+    db = AsyncSessionLocal()
+    try:
+        query, params = build_export_query(dataset, asset_type, start, end)
+        result = await db.stream(query, params)
+    except Exception as e:
+        await db.close()
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+    exported = 0
+    released = False
+
+    async def release():
+        # Runs from the body's finally and again as a background task, which also
+        # covers responses that fail before the body is ever iterated
+        nonlocal released
+        if released:
+            return
+        released = True
+        try:
+            await result.close()
+        finally:
+            await db.close()
+            instrumentation.count("rows_exported", exported, dataset=dataset, format=export_format)
+
+    async def body():
+        nonlocal exported
+        try:
+            async for rows in result.partitions(EXPORT_CHUNK_ROWS):
+                exported += len(rows)
+                # Encoding is CPU-bound; keep it off the event loop
+                yield await asyncio.to_thread(encoder.encode, rows)
+            yield encoder.finish()
+        finally:
+            await release()
+
+    headers = {"Content-Disposition": f'attachment; filename="{dataset}.{encoder.extension}"'}
+    if encoder.content_encoding:
+        headers["Content-Encoding"] = encoder.content_encoding
+    try:
+        return StreamingResponse(body(), media_type=encoder.media_type, headers=headers, background=BackgroundTask(release))
+    except Exception:
+        await release()
+        raise
+
+
+@app.get("/signals/stream")
+async def stream_signals(
+    asset_type: Optional[str] = None,
+    deals_only: bool = False,
+    since: Optional[datetime] = None,
+    last_event_id: Optional[str] = Header(None),  # noqa: B008
+):
+    """
+    Server-Sent Events stream of signal changes, pushed as soon as the
+    analytics job commits an upsert. Sends the current signals first (or only
+    those updated at or after `since`, or after the Last-Event-ID an
+    EventSource sends when it reconnects), then one `signal` event per change.
+    """
+    try:
+        after = decode_event_id(last_event_id) if last_event_id else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if after is None and since is not None:
+        after = (as_utc(since), "")
+
+    try:
+        await signal_hub.ensure_loaded()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Signals are unavailable: {e}") from e
+    try:
+        signal_hub.check_capacity()
+    except TooManySubscribers as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    instrumentation.count("stream_connections", resumed=after is not None)
+
+    # Subscribed by the body itself, so a response that never starts leaks nothing
+    subscriber = Subscriber(asset_type=asset_type, deals_only=deals_only)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # keep proxies from buffering events
+    return StreamingResponse(stream_events(signal_hub, subscriber, after), media_type="text/event-stream", headers=headers)
+
+
+@app.get("/index", response_model=List[Index])
+async def get_index(request: Request, db: AsyncSession = Depends(get_db)):  # noqa: B008
+    """
+    Retrieve the price indices materialized by the analytics job, one per asset class.
+    Responses are cached and support ETag / Last-Modified conditional requests.
+    """
+    try:
+        version = await indices_version.current(lambda: db.scalar(INDICES_VERSION_QUERY))
+        key = cache_key(request)
+        entry = response_cache.get(key, version)
+        if entry is None:
+            results = await db.execute(INDICES_QUERY)
+            indices = INDICES_ADAPTER.validate_python(results.mappings().all(), from_attributes=True)
+            entry = response_cache.put(key, INDICES_ADAPTER.dump_json(indices), version, last_modified=version)
+        return cached_response(request, entry)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
 
 # To run locally for development: `uvicorn api.app:app --reload`
 if __name__ == "__main__":
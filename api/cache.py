@@ -0,0 +1,135 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+
+import asyncpg
+from fastapi import Request, Response
+
+# --- Configuration ---
+CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "256"))
+CACHE_TTL = float(os.getenv("API_CACHE_TTL", "300")) # seconds
+VERSION_CHECK_INTERVAL = float(os.getenv("API_CACHE_VERSION_INTERVAL", "5")) # seconds between max(updated_at) checks
+NOTIFY_CHANNEL = "calif_signals_changed" # the analytics job NOTIFYs here after an upsert
+
+@dataclass
+class CachedResponse:
+    """A pre-serialized JSON body and the validators derived from it."""
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+    version: Any
+    expires_at: float
+
+# --- LRU + TTL Cache ---
+class ResponseCache:
+    """
+    In-process LRU cache of serialized responses. An entry is only served while
+    it is younger than the TTL and was built from the current data version.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def get(self, key: str, version: Any) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.version != version or entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, body: bytes, version: Any, last_modified: Optional[datetime] = None) -> CachedResponse:
+        entry = CachedResponse(
+            body=body,
+            etag=f'"{hashlib.sha1(body).hexdigest()}"',
+            last_modified=last_modified,
+            version=version,
+            expires_at=time.monotonic() + self.ttl,
+        )
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# --- Data Version ---
+class VersionTracker:
+    """
+    Remembers the latest data version for `interval` seconds so most requests
+    never query the database. invalidate() forces a re-check on the next request.
+    """
+
+    def __init__(self, interval: float = VERSION_CHECK_INTERVAL):
+        self.interval = interval
+        self._version: Any = None
+        self._checked_at = float("-inf")
+
+    async def current(self, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        if time.monotonic() - self._checked_at >= self.interval:
+            self._version = await fetch()
+            self._checked_at = time.monotonic()
+        return self._version
+
+    def invalidate(self):
+        self._checked_at = float("-inf")
+
+# --- HTTP Helpers ---
+def cache_key(request: Request) -> str:
+    """Keys entries by path and sorted query parameters."""
+    return f"{request.url.path}?{'&'.join(f'{k}={v}' for k, v in sorted(request.query_params.multi_items()))}"
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def is_not_modified(request: Request, entry: CachedResponse) -> bool:
+    """Evaluates If-None-Match, falling back to If-Modified-Since (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or entry.etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and entry.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return as_utc(entry.last_modified).replace(microsecond=0) <= as_utc(since)
+    return False
+
+def cached_response(request: Request, entry: CachedResponse) -> Response:
+    """Builds a 200 with the cached body, or a bodiless 304 for a matching conditional request."""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if entry.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(as_utc(entry.last_modified), usegmt=True)
+    if is_not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+# --- Change Notifications ---
+async def listen_for_changes(dsn: str, on_change: Callable[[], None]):
+    """
+    Opens a dedicated asyncpg connection that LISTENs on NOTIFY_CHANNEL and
+    calls `on_change` for every notification. Returns the connection so the
+    caller can close it on shutdown.
+    """
+    connection = await asyncpg.connect(dsn)
+    await connection.add_listener(NOTIFY_CHANNEL, lambda *args: on_change())
+    return connection
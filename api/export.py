@@ -0,0 +1,221 @@
+import json
+import math
+import os
+import zlib
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from .cache import as_utc
+
+# --- Configuration ---
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000")) # rows fetched from the server-side cursor and encoded at a time
+DEFAULT_FORMAT = "ndjson" # when the client accepts anything (*/* or no Accept header)
+
+# --- Datasets ---
+SIGNAL_FIELDS = [
+    pa.field("asset_type", pa.string()),
+    pa.field("last_price", pa.float64()),
+    pa.field("rolling_mean_30d", pa.float64()),
+    pa.field("z_score", pa.float64()),
+    pa.field("is_deal", pa.bool_()),
+    pa.field("updated_at", pa.timestamp("us", tz="UTC")),
+]
+SCHEMAS = {
+    "signals": pa.schema(SIGNAL_FIELDS),
+    "history": pa.schema([pa.field("id", pa.int64())] + SIGNAL_FIELDS),
+}
+# Ordered so an export can be resumed from its last row with the same filters
+EXPORT_TABLES = {
+    "signals": ("signals", "asset_type"),
+    "history": ("signal_history", "updated_at, id"),
+}
+
+def build_export_query(
+    dataset: str,
+    asset_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """
+    The SELECT for one export, with only the filters that are set in the
+    WHERE clause. A naive start or end is read as UTC.
+    """
+    table, order = EXPORT_TABLES[dataset]
+    clauses, params = [], {}
+    if asset_type is not None:
+        clauses.append("asset_type = :asset_type")
+        params["asset_type"] = asset_type
+    if start is not None:
+        clauses.append("updated_at >= :start")
+        params["start"] = as_utc(start)
+    if end is not None:
+        clauses.append("updated_at < :end")
+        params["end"] = as_utc(end)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    columns = ", ".join(SCHEMAS[dataset].names)
+    query = text(f"SELECT {columns} FROM {table} {where} ORDER BY {order}")
+    # Rows are pulled from a server-side cursor a chunk at a time
+    return query.execution_options(yield_per=EXPORT_CHUNK_ROWS), params
+
+# --- Content Negotiation ---
+class UnsupportedFormat(ValueError):
+    """Raised when none of the formats the client accepts can be produced."""
+
+# format -> (media type, file extension, allowed compressions, default compression)
+FORMATS: Dict[str, Tuple[str, str, Tuple[str, ...], str]] = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows", ("none", "lz4", "zstd"), "none"),
+    "parquet": ("application/vnd.apache.parquet", "parquet", ("none", "snappy", "zstd", "gzip"), "snappy"),
+    "ndjson": ("application/x-ndjson", "ndjson", ("none", "gzip"), "none"),
+}
+MEDIA_TYPES = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+def parse_accept(accept: str) -> list:
+    """Media types from an Accept header, most preferred first; q=0 entries are dropped."""
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_type.lower()))
+    return [media_type for _, _, media_type in sorted(candidates)]
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Picks the export format: an explicit `requested` format wins, otherwise the
+    Accept media type with the highest q-value that we can produce.
+    """
+    if requested is not None:
+        if requested not in FORMATS:
+            raise UnsupportedFormat(f"Unknown format '{requested}'. Expected one of: {', '.join(FORMATS)}.")
+        return requested
+    if not accept:
+        return DEFAULT_FORMAT
+    for media_type in parse_accept(accept):
+        if media_type in MEDIA_TYPES:
+            return MEDIA_TYPES[media_type]
+        if media_type in ("*/*", "application/*"):
+            return DEFAULT_FORMAT
+    raise UnsupportedFormat(f"None of the accepted media types can be produced. Supported: {', '.join(MEDIA_TYPES)}.")
+
+# --- Encoders ---
+class _Sink:
+    """Write-only file whose contents are handed out after every chunk, so nothing accumulates."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+def _json_value(value):
+    """JSON has no NaN or Infinity (e.g. a z_score over a flat window), so they are written as null."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def rows_to_batch(schema: pa.Schema, rows: Sequence[Sequence]) -> pa.RecordBatch:
+    """Builds a record batch column by column from database row tuples."""
+    columns = list(zip(*rows, strict=True)) if rows else [()] * len(schema)
+    return pa.record_batch([pa.array(values, type=field.type) for values, field in zip(columns, schema, strict=True)], schema=schema)
+
+class ExportEncoder:
+    """
+    Turns chunks of rows into the bytes of one streamed export. encode() is
+    called once per chunk and finish() once at the end; each returns only the
+    bytes produced since the previous call.
+    """
+
+    def __init__(self, export_format: str, schema: pa.Schema, compression: Optional[str] = None):
+        media_type, extension, compressions, default = FORMATS[export_format]
+        compression = (compression or default).lower()
+        if compression not in compressions:
+            raise ValueError(f"Compression '{compression}' is not available for {export_format}. Expected one of: {', '.join(compressions)}.")
+        self.format = export_format
+        self.schema = schema
+        self.compression = compression
+        self.media_type = media_type
+        self.extension = extension
+        self._sink = _Sink()
+        self._writer = None
+        self._gzip = None
+        codec = None if compression == "none" else compression
+        if export_format == "arrow":
+            options = ipc.IpcWriteOptions(compression=codec)
+            self._writer = ipc.new_stream(pa.PythonFile(self._sink, mode="w"), schema, options=options)
+        elif export_format == "parquet":
+            self._writer = pq.ParquetWriter(pa.PythonFile(self._sink, mode="w"), schema, compression=codec or "none")
+        elif codec == "gzip":
+            self._gzip = zlib.compressobj(wbits=31) # gzip container
+
+    @property
+    def content_encoding(self) -> Optional[str]:
+        """gzip-compressed NDJSON is sent as Content-Encoding, so HTTP clients decode it transparently."""
+        return "gzip" if self._gzip is not None else None
+
+    def encode(self, rows: Sequence[Sequence]) -> bytes:
+        if not rows:
+            return b""
+        if self.format == "ndjson":
+            return self._compress(self._ndjson(rows))
+        # One IPC record batch, or one Parquet row group, per chunk
+        self._writer.write_batch(rows_to_batch(self.schema, rows))
+        return self._sink.take()
+
+    def finish(self) -> bytes:
+        if self._writer is not None:
+            self._writer.close()
+            return self._sink.take()
+        if self._gzip is not None:
+            return self._gzip.flush()
+        return b""
+
+    def _ndjson(self, rows: Sequence[Sequence]) -> bytes:
+        names = self.schema.names
+        lines = []
+        for row in rows:
+            record = {name: _json_value(value) for name, value in zip(names, row, strict=True)}
+            lines.append(json.dumps(record, separators=(",", ":"), allow_nan=False))
+        lines.append("")
+        return "\n".join(lines).encode("utf-8")
+
+    def _compress(self, data: bytes) -> bytes:
+        return self._gzip.compress(data) if self._gzip is not None else data
@@ -0,0 +1,76 @@
+import os
+from datetime import datetime, timedelta
+from typing import List, Sequence, Tuple
+
+from sqlalchemy import text
+
+# --- Configuration ---
+MAX_POINTS = int(os.getenv("SERIES_MAX_POINTS", "2000")) # hard cap on points per response
+DEFAULT_POINTS = 500
+DEFAULT_RANGE = timedelta(days=30)
+LTTB_OVERSAMPLE = 4 # LTTB picks its points from this many SQL buckets per output point
+
+# One row per non-empty bucket; the bucket index is computed relative to :start
+# so the scan only touches rows in range via the (asset_type, updated_at) index.
+BUCKETS_QUERY = text("""
+    SELECT
+        floor(extract(epoch FROM updated_at - :start) / :width)::bigint AS bucket,
+        min(updated_at) AS first_at,
+        (array_agg(last_price ORDER BY updated_at, id))[1] AS open,
+        max(last_price) AS high,
+        min(last_price) AS low,
+        (array_agg(last_price ORDER BY updated_at DESC, id DESC))[1] AS close,
+        avg(last_price) AS mean,
+        count(*) AS count
+    FROM signal_history
+    WHERE asset_type = :asset_type AND updated_at >= :start AND updated_at < :end
+        AND last_price IS NOT NULL
+    GROUP BY bucket
+    ORDER BY bucket
+""")
+
+def bucket_width(start: datetime, end: datetime, points: int) -> float:
+    """Bucket width in seconds so that [start, end) splits into at most `points` buckets."""
+    return max((end - start).total_seconds() / points, 1e-6)
+
+def bucket_params(asset_type: str, start: datetime, end: datetime, buckets: int) -> dict:
+    return {"asset_type": asset_type, "start": start, "end": end, "width": bucket_width(start, end, buckets)}
+
+def bucket_time(start: datetime, width: float, bucket: int) -> datetime:
+    return start + timedelta(seconds=bucket * width)
+
+# --- Largest-Triangle-Three-Buckets ---
+def lttb(points: Sequence[Tuple[float, float]], threshold: int) -> List[int]:
+    """
+    Downsamples (x, y) points, sorted by x, to `threshold` points with
+    Largest-Triangle-Three-Buckets, keeping the visual shape of the series.
+    Returns the indexes of the kept points.
+    """
+    n = len(points)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+
+    kept = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        next_slice = points[next_start:next_end]
+        avg_x = sum(p[0] for p in next_slice) / len(next_slice)
+        avg_y = sum(p[1] for p in next_slice) / len(next_slice)
+
+        ax, ay = points[a]
+        best, best_area = -1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            bx, by = points[j]
+            area = abs((ax - avg_x) * (by - ay) - (ax - bx) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
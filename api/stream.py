@@ -0,0 +1,213 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from common import instrumentation
+
+# --- Configuration ---
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256")) # events buffered per client before it has to re-sync
+STREAM_MAX_CLIENTS = int(os.getenv("STREAM_MAX_CLIENTS", "1000")) # concurrent subscribers per API instance
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15")) # seconds between keep-alive comments
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "60")) # seconds; fallback check if a NOTIFY is missed
+STREAM_RETRY_MS = 5000 # reconnect delay suggested to EventSource clients
+WATERMARK_OVERLAP = timedelta(minutes=5) # updated_at is the upsert's transaction start, so commits can land out of order
+
+Position = Tuple[datetime, str] # (updated_at, asset_type): the order events are sent in
+
+def position(row: dict) -> Position:
+    return row["updated_at"], row["asset_type"]
+
+# --- Event Ids ---
+def encode_event_id(row: dict) -> str:
+    return f"{row['updated_at'].isoformat()} {row['asset_type']}"
+
+def decode_event_id(event_id: str) -> Position:
+    """Parses a Last-Event-ID back into the position of the last event the client saw."""
+    updated_at, separator, asset_type = event_id.partition(" ")
+    if not separator:
+        raise ValueError(f"Invalid event id: {event_id}")
+    parsed = datetime.fromisoformat(updated_at)
+    # Ids are sent in UTC; one without an offset is read as UTC too
+    return (parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)), asset_type
+
+def format_event(row: dict) -> bytes:
+    """One Server-Sent Event carrying a signal row as JSON."""
+    data = json.dumps({**row, "updated_at": row["updated_at"].isoformat()}, separators=(",", ":"))
+    return f"id: {encode_event_id(row)}\nevent: signal\ndata: {data}\n\n".encode("utf-8")
+
+# --- Subscribers ---
+class Subscriber:
+    """
+    One connected client: its filters, a bounded queue of pending rows, and
+    the position of the last row it was sent. When the queue overflows the
+    client is marked lagged instead of blocking the hub, and re-syncs from
+    the hub's snapshot once it catches up.
+    """
+
+    def __init__(self, asset_type: Optional[str] = None, deals_only: bool = False, queue_size: int = STREAM_QUEUE_SIZE):
+        self.asset_type = asset_type
+        self.deals_only = deals_only
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.lagged = False
+        self.last_position: Optional[Position] = None
+
+    def matches(self, row: dict) -> bool:
+        if self.asset_type is not None and row["asset_type"] != self.asset_type:
+            return False
+        return not self.deals_only or bool(row["is_deal"])
+
+    def offer(self, row: dict):
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            # Drop what is queued; the re-sync replays it from the snapshot
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None) # wake the client's stream
+            instrumentation.count("stream_resyncs")
+
+class TooManySubscribers(RuntimeError):
+    """Raised when an instance already serves STREAM_MAX_CLIENTS streams."""
+
+# --- Hub ---
+class SignalHub:
+    """
+    Fans signal changes out from one database reader to every connected
+    client. A NOTIFY (or, as a fallback, a timer) makes the hub read the rows
+    changed since its watermark, once for all clients. The hub keeps the
+    latest row per asset type, so resuming clients are replayed from memory
+    rather than from Postgres.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Optional[datetime]], Awaitable[List[dict]]],
+        max_clients: int = STREAM_MAX_CLIENTS,
+        poll_interval: float = STREAM_POLL_INTERVAL,
+    ):
+        self.fetch = fetch # rows with updated_at >= the argument, or all rows for None
+        self.max_clients = max_clients
+        self.poll_interval = poll_interval
+        self.snapshot: Dict[str, dict] = {}
+        self.subscribers: set = set()
+        self.loaded = False
+        self._changed = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    @property
+    def watermark(self) -> Optional[datetime]:
+        return max((row["updated_at"] for row in self.snapshot.values()), default=None)
+
+    async def refresh(self) -> int:
+        """Reads new and changed rows into the snapshot and offers them to subscribers. Returns how many changed."""
+        async with self._lock:
+            since = self.watermark - WATERMARK_OVERLAP if self.snapshot else None
+            rows = sorted(await self.fetch(since), key=position)
+            return self._apply(rows)
+
+    async def ensure_loaded(self):
+        """Loads the snapshot if the hub has not managed to yet (e.g. Postgres was down at startup)."""
+        if not self.loaded:
+            await self.refresh()
+
+    def _apply(self, rows: List[dict]) -> int:
+        changed = 0
+        for row in rows:
+            current = self.snapshot.get(row["asset_type"])
+            if current is not None and current["updated_at"] >= row["updated_at"]:
+                continue
+            self.snapshot[row["asset_type"]] = row
+            changed += 1
+            if self.loaded:
+                for subscriber in self.subscribers:
+                    if subscriber.matches(row):
+                        subscriber.offer(row)
+        self.loaded = True
+        return changed
+
+    def notify(self):
+        """Called for every NOTIFY on the change channel; safe from asyncpg's listener callback."""
+        self._changed.set()
+
+    async def run(self):
+        """Refreshes on every notification, and every poll_interval while anyone is subscribed."""
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                if not self.subscribers:
+                    continue
+            self._changed.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Signal stream refresh failed: {e}")
+
+    def check_capacity(self):
+        if len(self.subscribers) >= self.max_clients:
+            raise TooManySubscribers(f"This instance already serves {self.max_clients} streams")
+
+    def subscribe(self, subscriber: Subscriber, after: Optional[Position] = None) -> List[dict]:
+        """
+        Registers a client and returns the rows it missed after `after`
+        (everything matching for None), oldest first. Later changes arrive
+        through its queue.
+        """
+        self.check_capacity()
+        subscriber.last_position = after
+        # Registered only once the replay worked, so a failure cannot leak a slot
+        backlog = self.replay(subscriber)
+        self.subscribers.add(subscriber)
+        return backlog
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def replay(self, subscriber: Subscriber) -> List[dict]:
+        """Snapshot rows the subscriber has not been sent yet."""
+        after = subscriber.last_position
+        return sorted(
+            (row for row in self.snapshot.values() if subscriber.matches(row) and (after is None or position(row) > after)),
+            key=position,
+        )
+
+async def stream_events(hub: SignalHub, subscriber: Subscriber, after: Optional[Position] = None, heartbeat: float = STREAM_HEARTBEAT):
+    """
+    Yields the SSE body for one subscriber: the rows it missed after `after`,
+    then live changes, with a keep-alive comment whenever nothing was sent
+    for `heartbeat` seconds. A lagged subscriber is caught up from the
+    snapshot. The subscription is taken when the body starts and released
+    when it ends, so a response that is never iterated holds no slot.
+    """
+    try:
+        try:
+            pending = hub.subscribe(subscriber, after)
+        except TooManySubscribers:
+            # Filled up since the handler checked; EventSource reconnects on its own
+            return
+        yield f"retry: {STREAM_RETRY_MS}\n\n".encode("utf-8")
+        while True:
+            for row in pending:
+                if subscriber.last_position is None or position(row) > subscriber.last_position:
+                    subscriber.last_position = position(row)
+                yield format_event(row)
+            try:
+                row = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                pending = []
+                yield b": keep-alive\n\n"
+                continue
+            if subscriber.lagged:
+                subscriber.lagged = False
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                pending = hub.replay(subscriber)
+            else:
+                pending = [row]
+    finally:
+        hub.unsubscribe(subscriber)
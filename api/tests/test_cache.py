@@ -0,0 +1,76 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.cache import ResponseCache, cache_key, cached_response
+
+UPDATED_AT = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+def make_client(cache: ResponseCache, version) -> TestClient:
+    """A minimal app that serves one cached body the way the API endpoints do."""
+    app = FastAPI()
+    calls = []
+
+    @app.get("/signals")
+    async def signals(request: Request):
+        key = cache_key(request)
+        entry = cache.get(key, version)
+        if entry is None:
+            calls.append(key)
+            entry = cache.put(key, b'[{"asset_type":"watch"}]', version, last_modified=UPDATED_AT)
+        return cached_response(request, entry)
+
+    client = TestClient(app)
+    client.calls = calls
+    return client
+
+def test_lru_evicts_least_recently_used():
+    """Test that the oldest untouched entry is evicted first."""
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.put("a", b"a", 1)
+    cache.put("b", b"b", 1)
+    cache.get("a", 1)
+    cache.put("c", b"c", 1)
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None
+
+def test_entries_expire_and_follow_version():
+    """Test that stale versions and expired entries are not served."""
+    cache = ResponseCache(ttl=60)
+    cache.put("a", b"a", version=1)
+    assert cache.get("a", version=2) is None
+
+    expired = ResponseCache(ttl=0)
+    expired.put("a", b"a", version=1)
+    assert expired.get("a", version=1) is None
+
+def test_repeat_requests_are_served_from_cache():
+    """Test that a second request with the same parameters skips the producer."""
+    client = make_client(ResponseCache(), version=UPDATED_AT)
+    first = client.get("/signals?b=2&a=1")
+    second = client.get("/signals?a=1&b=2")
+    assert first.content == second.content == b'[{"asset_type":"watch"}]'
+    assert len(client.calls) == 1
+    assert first.headers["Last-Modified"] == "Tue, 02 Jan 2024 03:04:05 GMT"
+
+def test_conditional_requests_get_304():
+    """Test that matching ETag or Last-Modified validators yield 304 without a body."""
+    client = make_client(ResponseCache(), version=UPDATED_AT)
+    etag = client.get("/signals").headers["ETag"]
+
+    by_etag = client.get("/signals", headers={"If-None-Match": etag})
+    assert by_etag.status_code == 304
+    assert by_etag.content == b""
+
+    by_date = client.get("/signals", headers={"If-Modified-Since": "Tue, 02 Jan 2024 03:04:05 GMT"})
+    assert by_date.status_code == 304
+
+    changed = client.get("/signals", headers={"If-None-Match": '"other"'})
+    assert changed.status_code == 200
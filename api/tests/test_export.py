@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import pytest
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.export import (
+    SCHEMAS,
+    ExportEncoder,
+    UnsupportedFormat,
+    build_export_query,
+    negotiate_format,
+)
+
+
+def signal_rows(count: int, offset: int = 0) -> list:
+    updated_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [("watch", 100.0 + i, 110.0, -1.5, i % 2 == 0, updated_at) for i in range(offset, offset + count)]
+
+def export(encoder: ExportEncoder, chunks: list) -> bytes:
+    return b"".join(encoder.encode(rows) for rows in chunks) + encoder.finish()
+
+def test_format_is_negotiated_from_the_accept_header():
+    """Test that the most preferred producible media type wins and an explicit format overrides Accept."""
+    assert negotiate_format(None) == "ndjson"
+    assert negotiate_format("*/*") == "ndjson"
+    assert negotiate_format("application/vnd.apache.arrow.stream") == "arrow"
+    assert negotiate_format("application/x-ndjson;q=0.5, application/vnd.apache.parquet") == "parquet"
+    assert negotiate_format("text/html, application/jsonl;q=0.1") == "ndjson"
+    assert negotiate_format("application/vnd.apache.parquet;q=0, */*;q=0.1") == "ndjson"
+    assert negotiate_format("text/html", requested="arrow") == "arrow"
+
+def test_unsupported_formats_are_rejected():
+    """Test that unknown formats and compressions raise instead of falling back silently."""
+    with pytest.raises(UnsupportedFormat):
+        negotiate_format("text/html, application/json")
+    with pytest.raises(UnsupportedFormat):
+        negotiate_format(None, requested="csv")
+    with pytest.raises(ValueError):
+        ExportEncoder("ndjson", SCHEMAS["signals"], compression="zstd")
+
+def test_export_query_only_filters_on_what_is_set():
+    """Test that the export query filters history by the given parameters and orders it for resuming."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    query, params = build_export_query("history", asset_type="watch", start=start)
+    sql = str(query)
+    assert "FROM signal_history WHERE asset_type = :asset_type AND updated_at >= :start ORDER BY updated_at, id" in sql
+    assert params == {"asset_type": "watch", "start": start}
+    query, params = build_export_query("signals")
+    assert "WHERE" not in str(query) and params == {}
+    assert query.get_execution_options()["yield_per"] > 0
+
+def test_export_bounds_without_offset_are_utc():
+    """Test that naive export bounds are sent to Postgres as UTC, matching the series endpoint."""
+    _, params = build_export_query("history", start=datetime(2024, 1, 1), end=datetime(2024, 2, 1))
+    assert params["start"] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert params["end"] == datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+@pytest.mark.parametrize("compression", ["none", "zstd"])
+def test_arrow_stream_round_trips_chunk_by_chunk(compression):
+    """Test that each chunk becomes one record batch of an Arrow IPC stream."""
+    encoder = ExportEncoder("arrow", SCHEMAS["signals"], compression)
+    table = ipc.open_stream(export(encoder, [signal_rows(3), [], signal_rows(2, offset=3)])).read_all()
+    assert table.num_rows == 5
+    assert table.schema.equals(SCHEMAS["signals"])
+    assert table.column("last_price").to_pylist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert table.column("updated_at").to_pylist()[0] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def test_parquet_writes_one_row_group_per_chunk(tmp_path):
+    """Test that streamed Parquet output is a valid file with a row group per chunk."""
+    encoder = ExportEncoder("parquet", SCHEMAS["signals"])
+    path = tmp_path / "signals.parquet"
+    path.write_bytes(export(encoder, [signal_rows(3), signal_rows(4, offset=3)]))
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.read().column("is_deal").to_pylist() == [True, False, True, False, True, False, True]
+
+def test_ndjson_can_be_gzipped():
+    """Test that gzip NDJSON chunks form one gzip stream of one JSON object per row."""
+    encoder = ExportEncoder("ndjson", SCHEMAS["signals"], "gzip")
+    assert encoder.content_encoding == "gzip"
+    lines = gzip.decompress(export(encoder, [signal_rows(2), signal_rows(1, offset=2)])).decode().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 3
+    assert records[0] == {
+        "asset_type": "watch", "last_price": 100.0, "rolling_mean_30d": 110.0, "z_score": -1.5,
+        "is_deal": True, "updated_at": "2024-01-01T00:00:00+00:00",
+    }
+
+def test_ndjson_writes_non_finite_floats_as_null():
+    """Test that NaN and infinite values become null so every line stays valid JSON."""
+    encoder = ExportEncoder("ndjson", SCHEMAS["signals"])
+    rows = [("watch", 100.0, 100.0, float("inf"), False, None), ("wine", float("nan"), 10.0, float("-inf"), False, None)]
+    records = [json.loads(line) for line in export(encoder, [rows]).decode().splitlines()]
+    assert [record["z_score"] for record in records] == [None, None]
+    assert records[1]["last_price"] is None and records[0]["updated_at"] is None
@@ -0,0 +1,37 @@
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.series import bucket_params, bucket_time, bucket_width, lttb
+
+
+def test_buckets_cover_range_within_budget():
+    """Test that the bucket width splits the range into exactly the point budget."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    end = start + timedelta(days=30)
+    width = bucket_width(start, end, 720)
+    assert width == 3600
+    assert bucket_time(start, width, 719) + timedelta(seconds=width) == end
+    assert bucket_params("watch", start, end, 720)["width"] == width
+
+def test_lttb_respects_threshold_and_keeps_endpoints():
+    """Test that LTTB returns the requested number of points, first and last included."""
+    points = [(float(x), math.sin(x / 10)) for x in range(1000)]
+    kept = lttb(points, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert kept == sorted(kept)
+
+def test_lttb_keeps_spikes():
+    """Test that LTTB preserves an outlier that averaging would flatten."""
+    points = [(float(x), 0.0) for x in range(100)]
+    points[42] = (42.0, 100.0)
+    assert 42 in lttb(points, 10)
+
+def test_lttb_short_series_unchanged():
+    """Test that series already under the budget are returned whole."""
+    assert lttb([(0.0, 1.0), (1.0, 2.0)], 10) == [0, 1]
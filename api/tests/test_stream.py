@@ -0,0 +1,155 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.stream import (
+    SignalHub,
+    Subscriber,
+    TooManySubscribers,
+    decode_event_id,
+    encode_event_id,
+    stream_events,
+)
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def signal(asset_type: str, minutes: int, is_deal: bool = True) -> dict:
+    return {"asset_type": asset_type, "last_price": 100.0, "rolling_mean_30d": 110.0, "z_score": -2.0,
+            "is_deal": is_deal, "updated_at": T0 + timedelta(minutes=minutes)}
+
+class FakeSignals:
+    """Stands in for the signals table; records the `since` of every fetch."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.fetches = []
+
+    async def __call__(self, since):
+        self.fetches.append(since)
+        return [row for row in self.rows if since is None or row["updated_at"] >= since]
+
+    def upsert(self, row):
+        self.rows = [r for r in self.rows if r["asset_type"] != row["asset_type"]] + [row]
+
+def event_ids(chunks) -> list:
+    return [line[4:] for chunk in chunks for line in chunk.decode().splitlines() if line.startswith("id: ")]
+
+def test_event_ids_round_trip():
+    """Test that an event id decodes back to the (updated_at, asset_type) position it was built from."""
+    row = signal("watch", 5)
+    assert decode_event_id(encode_event_id(row)) == (row["updated_at"], "watch")
+    assert decode_event_id("2024-01-01T00:00:00 watch") == (T0, "watch")
+    with pytest.raises(ValueError):
+        decode_event_id("garbage")
+
+def test_one_refresh_fans_out_to_matching_subscribers():
+    """Test that a refresh reads changes once and queues them only for subscribers whose filters match."""
+    async def scenario():
+        table = FakeSignals([signal("watch", 0), signal("bag", 0)])
+        hub = SignalHub(table)
+        await hub.refresh()
+        everything, watches, deals = Subscriber(), Subscriber(asset_type="watch"), Subscriber(deals_only=True)
+        assert len(hub.subscribe(everything)) == 2
+        hub.subscribe(watches)
+        hub.subscribe(deals)
+
+        table.upsert(signal("watch", 10, is_deal=False))
+        assert await hub.refresh() == 1
+        assert table.fetches[-1] == T0 - timedelta(minutes=5) # watermark minus the overlap
+        return [subscriber.queue.qsize() for subscriber in (everything, watches, deals)]
+
+    assert asyncio.run(scenario()) == [1, 1, 0]
+
+def test_resume_replays_only_missed_rows_from_memory():
+    """Test that subscribing after a position replays newer snapshot rows without querying the database."""
+    async def scenario():
+        table = FakeSignals([signal("watch", 0), signal("bag", 10), signal("car", 10)])
+        hub = SignalHub(table)
+        await hub.refresh()
+        backlog = hub.subscribe(Subscriber(), after=(T0 + timedelta(minutes=10), "bag"))
+        return backlog, len(table.fetches)
+
+    backlog, fetches = asyncio.run(scenario())
+    assert [row["asset_type"] for row in backlog] == ["car"]
+    assert fetches == 1
+
+def test_slow_subscriber_resyncs_instead_of_blocking():
+    """Test that an overflowing subscriber is marked lagged and catches up from the snapshot."""
+    async def scenario():
+        table = FakeSignals([])
+        hub = SignalHub(table)
+        await hub.refresh()
+        subscriber = Subscriber(queue_size=2)
+        events = stream_events(hub, subscriber, heartbeat=1)
+        await events.__anext__() # retry hint
+        for minutes, asset_type in enumerate(["watch", "bag", "car", "art"]):
+            table.upsert(signal(asset_type, minutes))
+            await hub.refresh()
+        assert subscriber.lagged
+        chunks = [await events.__anext__() for _ in range(4)]
+        await events.aclose()
+        return chunks, hub.subscribers
+
+    chunks, subscribers = asyncio.run(scenario())
+    assert [event_id.split(" ")[1] for event_id in event_ids(chunks)] == ["watch", "bag", "car", "art"]
+    assert not subscribers
+
+def test_stream_sends_keep_alives():
+    """Test that an idle stream sends keep-alive comments."""
+    async def scenario():
+        hub = SignalHub(FakeSignals([]))
+        subscriber = Subscriber()
+        events = stream_events(hub, subscriber, heartbeat=0.01)
+        chunks = [await events.__anext__() for _ in range(2)]
+        await events.aclose()
+        return chunks
+
+    assert asyncio.run(scenario()) == [b"retry: 5000\n\n", b": keep-alive\n\n"]
+
+def test_subscribers_are_capped():
+    """Test that an instance refuses streams beyond its client limit."""
+    async def scenario():
+        hub = SignalHub(FakeSignals([]), max_clients=1)
+        hub.subscribe(Subscriber())
+        with pytest.raises(TooManySubscribers):
+            hub.subscribe(Subscriber())
+
+    asyncio.run(scenario())
+
+def test_naive_resume_position_does_not_leak_a_slot():
+    """Test that a resume position without a timezone is replayed and a failing replay registers nothing."""
+    async def scenario():
+        hub = SignalHub(FakeSignals([signal("watch", 0), signal("bag", 10)]), max_clients=1)
+        await hub.refresh()
+        with pytest.raises(TypeError):
+            hub.subscribe(Subscriber(), after=(datetime(2024, 1, 1), "watch"))
+        assert not hub.subscribers
+        return hub.subscribe(Subscriber(), after=decode_event_id("2024-01-01T00:00:00 watch"))
+
+    assert [row["asset_type"] for row in asyncio.run(scenario())] == ["bag"]
+
+def test_stream_holds_a_slot_only_while_the_body_runs():
+    """Test that a stream body that is never iterated never subscribes, and one that ends releases its slot."""
+    async def scenario():
+        hub = SignalHub(FakeSignals([signal("watch", 0)]), max_clients=1)
+        await hub.refresh()
+        abandoned = stream_events(hub, Subscriber(), heartbeat=0.01)
+        await abandoned.aclose()
+        assert not hub.subscribers
+
+        events = stream_events(hub, Subscriber(), heartbeat=0.01)
+        chunks = [await events.__anext__() for _ in range(2)]
+        assert len(hub.subscribers) == 1
+        await events.aclose()
+        return chunks, hub.subscribers
+
+    chunks, subscribers = asyncio.run(scenario())
+    assert [event_id.split(" ")[1] for event_id in event_ids(chunks)] == ["watch"]
+    assert not subscribers
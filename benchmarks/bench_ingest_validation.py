@@ -0,0 +1,52 @@
+"""
+Compares per-item Pydantic validation with the batch TypeAdapter fast path.
+
+Usage: python benchmarks/bench_ingest_validation.py --items 200000 --page-size 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_ingest.browse_ai_ingest import (
+    WatchAsset,
+    serialize_assets,
+    validate_pages,
+    validate_pages_fast,
+)
+
+
+def make_pages(items: int, page_size: int) -> list:
+    captured = [
+        {"price": 1000 + i, "model": f"Model {i % 500}", "reference": f"REF-{i}", "condition": "used"}
+        for i in range(items)
+    ]
+    return [("watch", WatchAsset, captured[i:i + page_size]) for i in range(0, items, page_size)]
+
+
+def timed(label: str, fn, pages: list, items: int) -> float:
+    start = time.perf_counter()
+    rows = sum(1 for _ in fn(pages))
+    elapsed = time.perf_counter() - start
+    assert rows == items
+    print(f"{label:<26}{elapsed:8.3f}s {items / elapsed:14,.0f} items/sec")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--page-size", type=int, default=1_000)
+    args = parser.parse_args()
+
+    pages = make_pages(args.items, args.page_size)
+    print(f"Validating {args.items:,} items in pages of {args.page_size:,}...")
+    model_time = timed("per-item models:", lambda p: serialize_assets(validate_pages(p)), pages, args.items)
+    fast_time = timed("batch TypeAdapter:", validate_pages_fast, pages, args.items)
+    print(f"{'speedup:':<26}{model_time / fast_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Measures how the sharded signal engine scales with worker processes.
+
+Usage: python benchmarks/bench_parallel_signals.py --rows 10000000 --groups 50000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analytics.signal_engine import compute_rolling_signals
+from benchmarks.bench_signal_engine import make_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--groups", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shard-rows", type=int, default=None, help="defaults to rows / (2 * max workers)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    shard_rows = args.shard_rows or max(args.rows // (2 * max(args.workers)), 1)
+    df = make_frame(args.rows, args.groups, args.seed)
+    print(f"Benchmarking {args.rows:,} rows across {args.groups:,} series, "
+          f"{shard_rows:,} rows per shard, {os.cpu_count()} CPUs available...")
+
+    baseline, expected = None, None
+    for workers in args.workers:
+        frame = df.copy()
+        start = time.perf_counter()
+        result = compute_rolling_signals(frame, workers=workers, shard_rows=shard_rows)
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            baseline, expected = elapsed, result['rolling_mean_30d'].to_numpy()
+        else:
+            np.testing.assert_allclose(result['rolling_mean_30d'], expected, rtol=1e-12, equal_nan=True)
+        speedup = baseline / elapsed
+        print(f"{workers:3d} workers: {elapsed:8.3f}s  speedup {speedup:5.2f}x  efficiency {speedup / workers * args.workers[0]:5.0%}")
+
+
+if __name__ == "__main__":
+    main()
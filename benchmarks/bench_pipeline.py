@@ -0,0 +1,241 @@
+"""
+End-to-end pipeline benchmark on synthetic listings.
+
+Runs each stage on its own, then the whole chain, at every requested size:
+
+  ingest   Browse AI page parsing + validation (validate_page_rows)
+  signals  calculate_signals over the listings window
+  upsert   upsert_signals_to_postgres (needs --postgres-url; use a scratch database)
+  chain    pages -> validation -> typed batches -> streaming signals [-> upsert]
+
+Every stage runs in a fresh process so its peak RSS is its own. Results
+(throughput, p50/p99 per batch, peak RSS) are written as JSON; --compare
+checks them against an earlier run and exits non-zero on a regression.
+
+Usage:
+  python benchmarks/bench_pipeline.py --sizes 10k 1M --output baseline.json
+  python benchmarks/bench_pipeline.py --sizes 10k 1M --compare baseline.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analytics.calculate_signals import (
+    batch_to_frame,
+    calculate_signals,
+    calculate_signals_streaming,
+    upsert_signals_to_postgres,
+)
+from benchmarks.synthetic import captured_pages, listings_frame, parse_size, signal_rows
+from data_ingest.browse_ai_ingest import validate_page_rows
+
+STAGES = ["ingest", "signals", "upsert", "chain"]
+SERIES_FIELDS = ["brand", "reference"]
+CHAIN_BATCH_ROWS = 100_000
+UPSERT_CHUNK_ROWS = 10_000
+# Regressions are flagged on these metrics, in the direction that is worse
+METRICS = {"throughput": "lower", "p99_seconds": "higher", "peak_rss_mb": "higher"}
+
+
+# --- Stages (each returns processed rows and per-batch latencies) ---
+def run_ingest(rows: int, args) -> tuple[int, list]:
+    processed, latencies = 0, []
+    for asset_type, model, page in captured_pages(rows, args.page_size, args.seed):
+        start = time.perf_counter()
+        processed += len(validate_page_rows(asset_type, model, page))
+        latencies.append(time.perf_counter() - start)
+    return processed, latencies
+
+def run_signals(rows: int, args) -> tuple[int, list]:
+    df = listings_frame(rows, args.seed)
+    start = time.perf_counter()
+    calculate_signals(df)
+    return len(df), [time.perf_counter() - start]
+
+def run_upsert(rows: int, args) -> tuple[int, list]:
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(args.postgres_url)
+    with engine.begin() as connection:
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS signals (
+                asset_type TEXT PRIMARY KEY,
+                last_price DOUBLE PRECISION,
+                rolling_mean_30d DOUBLE PRECISION,
+                z_score DOUBLE PRECISION,
+                is_deal BOOLEAN,
+                updated_at TIMESTAMPTZ
+            )
+        """))
+    signals = signal_rows(rows, args.seed)
+    latencies = []
+    for first in range(0, rows, UPSERT_CHUNK_ROWS):
+        start = time.perf_counter()
+        upsert_signals_to_postgres(signals.iloc[first:first + UPSERT_CHUNK_ROWS], engine, method=args.upsert_method)
+        latencies.append(time.perf_counter() - start)
+    engine.dispose()
+    return rows, latencies
+
+def _to_frame(validated: list) -> pd.DataFrame:
+    """Validated rows as a typed frame, standing in for the BigQuery write/read round trip."""
+    raw = pd.DataFrame.from_records([row["raw_data"] for row in validated])
+    frame = pd.DataFrame({
+        "asset_type": [row["asset_type"] for row in validated],
+        "brand": raw["brand"],
+        "reference": raw["reference"],
+        "ingestion_timestamp": pd.to_datetime(raw["captured_at"], utc=True, format="ISO8601"),
+        "price": pd.to_numeric(raw["price"], errors="coerce"), # SAFE_CAST
+    }).dropna(subset=["price"])
+    frame = frame.sort_values("ingestion_timestamp", kind="stable")
+    return batch_to_frame(pa.RecordBatch.from_pandas(frame, preserve_index=False), series_fields=SERIES_FIELDS)
+
+def run_chain(rows: int, args) -> tuple[int, list]:
+    latencies, processed = [], 0
+
+    def batches():
+        nonlocal processed
+        validated = []
+        for asset_type, model, page in captured_pages(rows, args.page_size, args.seed):
+            validated.extend(validate_page_rows(asset_type, model, page))
+            if len(validated) >= CHAIN_BATCH_ROWS:
+                batch = _to_frame(validated)
+                processed += len(batch)
+                validated = []
+                yield batch
+        if validated:
+            batch = _to_frame(validated)
+            processed += len(batch)
+            yield batch
+
+    def timed(iterator):
+        start = time.perf_counter()
+        for batch in iterator:
+            yield batch
+            latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+
+    empty_state = pd.DataFrame(columns=["asset_type", "series_key", "ingestion_timestamp", "price"])
+    signals, _ = calculate_signals_streaming(timed(batches()), empty_state)
+    if args.postgres_url and not signals.empty:
+        from sqlalchemy import create_engine
+
+        engine = create_engine(args.postgres_url)
+        start = time.perf_counter()
+        upsert_signals_to_postgres(signals, engine, method=args.upsert_method)
+        latencies.append(time.perf_counter() - start)
+        engine.dispose()
+    return processed, latencies
+
+RUNNERS = {"ingest": run_ingest, "signals": run_signals, "upsert": run_upsert, "chain": run_chain}
+
+
+# --- Measurement ---
+def measure(stage: str, rows: int, args) -> dict:
+    """Runs in a fresh child process, so ru_maxrss is this stage's peak."""
+    start = time.perf_counter()
+    processed, latencies = RUNNERS[stage](rows, args)
+    elapsed = time.perf_counter() - start
+    latencies = np.asarray(latencies or [elapsed])
+    return {
+        "rows": processed,
+        "seconds": round(elapsed, 4),
+        "throughput": round(processed / max(elapsed, 1e-9), 1),
+        "batches": len(latencies),
+        "p50_seconds": round(float(np.percentile(latencies, 50)), 5),
+        "p99_seconds": round(float(np.percentile(latencies, 99)), 5),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1), # KiB on Linux
+    }
+
+def run_isolated(stage: str, rows: int, args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure, stage, rows, args).result()
+
+
+# --- Baseline Comparison ---
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Returns one line per metric that got worse than the baseline by more than `tolerance`."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get("results", {}).get(size, {}).get(stage)
+            if not previous:
+                continue
+            for metric, worse in METRICS.items():
+                before, after = previous[metric], current[metric]
+                if not before:
+                    continue
+                change = (after - before) / before
+                if (worse == "lower" and change < -tolerance) or (worse == "higher" and change > tolerance):
+                    regressions.append(f"{size} {stage} {metric}: {before} -> {after} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["10k", "1M"], help="e.g. 10k 1M 10M")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--page-size", type=int, default=1_000)
+    parser.add_argument("--postgres-url", default=os.getenv("BENCH_POSTGRES_URL"),
+                        help="scratch database for the upsert stage (skipped when unset)")
+    parser.add_argument("--upsert-method", choices=["values", "copy"], default="values")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown (default 15%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        rows = parse_size(size)
+        results[size] = {}
+        for stage in args.stages:
+            if stage == "upsert" and not args.postgres_url:
+                print(f"{size:>6} {stage:<8} skipped (no --postgres-url)")
+                continue
+            stats = run_isolated(stage, rows, args)
+            results[size][stage] = stats
+            print(f"{size:>6} {stage:<8} {stats['seconds']:9.3f}s {stats['throughput']:14,.0f} rows/s "
+                  f"p99 {stats['p99_seconds'] * 1000:9.1f}ms  peak RSS {stats['peak_rss_mb']:8.1f} MB")
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "page_size": args.page_size,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Cold-start cost of the Cloud Function entry points.
+
+Each repeat runs in a fresh interpreter, the way a new instance starts:
+
+  import   loading the entry module, as functions-framework does before it
+           serves (also broken down with -X importtime)
+  first    the first request through the entry point
+  warm     a second request on the same instance
+
+The Slack bot is driven with a non-deal Pub/Sub push, which needs no network.
+A real analytics run needs GCP credentials and POSTGRES_DB_URL in the
+environment; without them its requests stop at the configuration check and
+only the import numbers are meaningful.
+
+Usage:
+  python benchmarks/bench_startup.py --repeat 5 --output before.json
+  python benchmarks/bench_startup.py --repeat 5 --compare before.json
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+NON_DEAL_PUSH = {"message": {"data": base64.b64encode(json.dumps({"asset_type": "watch", "is_deal": False}).encode()).decode()}}
+TARGETS = {
+    "analytics": {"module": "analytics.calculate_signals", "entry": "process_signals", "path": "/", "json": None},
+    "slack_bot": {"module": "slack_bot.notify", "entry": "notify_slack", "path": "/", "json": NON_DEAL_PUSH},
+}
+METRICS = ["import_seconds", "first_request_seconds", "warm_request_seconds"]
+MIN_DELTA = 0.005 # seconds; smaller differences are timer noise, not regressions
+
+# Runs inside the fresh interpreter; the result is the last line of stdout
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+__import__({module!r}) # not importlib.import_module, which -X importtime does not log
+module = sys.modules[{module!r}]
+imported = time.perf_counter()
+from flask import Flask, request
+app, timings = Flask("bench"), []
+for _ in range(2):
+    with app.test_request_context({path!r}, method="POST", json={body!r}):
+        begin = time.perf_counter()
+        response = getattr(module, {entry!r})(request)
+        timings.append(time.perf_counter() - begin)
+status = response[1] if isinstance(response, tuple) else 200
+print(json.dumps({{"import_seconds": imported - start, "first_request_seconds": timings[0],
+                  "warm_request_seconds": timings[1], "status": status}}))
+"""
+
+
+def parse_importtime(stderr: str, module: str, top: int) -> list:
+    """The slowest modules imported directly by `module`, from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue # header line
+        rows.append(((len(name) - len(name.lstrip())) // 2, int(cumulative), name.strip()))
+    # Children are printed before their parent, so walk back from the module's own line
+    end = next((i for i, (_, _, name) in enumerate(rows) if name == module), None)
+    if end is None:
+        return []
+    depth, direct = rows[end][0], []
+    for child_depth, micros, name in reversed(rows[:end]):
+        if child_depth <= depth:
+            break
+        if child_depth == depth + 1:
+            direct.append((micros, name))
+    return [{"module": name, "seconds": micros / 1e6} for micros, name in sorted(direct, reverse=True)[:top]]
+
+def run_once(target: dict, importtime: bool) -> tuple[dict, str]:
+    script = CHILD.format(root=ROOT, module=target["module"], entry=target["entry"], path=target["path"], body=target["json"])
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", script]
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def measure(name: str, repeat: int, top: int) -> dict:
+    # -X importtime adds its own overhead, so the breakdown comes from a separate run
+    runs = [run_once(TARGETS[name], importtime=False)[0] for _ in range(repeat)]
+    _, stderr = run_once(TARGETS[name], importtime=True)
+    stats = {metric: statistics.median(run[metric] for run in runs) for metric in METRICS}
+    stats["status"] = runs[-1]["status"]
+    stats["slowest_imports"] = parse_importtime(stderr, TARGETS[name]["module"], top)
+    return stats
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Returns one line per metric that got slower than the baseline by more than `tolerance`."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric in METRICS:
+            before, after = previous[metric], current[metric]
+            change = (after - before) / before if before else 0.0
+            print(f"{name:<10} {metric:<22} {before * 1000:9.1f}ms -> {after * 1000:9.1f}ms ({change:+.0%})")
+            if change > tolerance and after - before > MIN_DELTA:
+                regressions.append(f"{name} {metric}: {before:.4f}s -> {after:.4f}s ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target (medians are reported)")
+    parser.add_argument("--top", type=int, default=8, help="slowest direct imports to list")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown (default 15%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.targets:
+        stats = measure(name, args.repeat, args.top)
+        results[name] = stats
+        print(f"{name:<10} import {stats['import_seconds'] * 1000:8.1f}ms  first request {stats['first_request_seconds'] * 1000:8.1f}ms  "
+              f"warm request {stats['warm_request_seconds'] * 1000:8.1f}ms  (status {stats['status']})")
+        for entry in stats["slowest_imports"]:
+            print(f"{'':<12}{entry['seconds'] * 1000:8.1f}ms  {entry['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Closed-loop load test for the CALIF API: reports requests/sec and latency percentiles.
+
+Usage: python benchmarks/load_test_api.py --url http://localhost:8000 --path /signals --requests 5000 --concurrency 64
+Run it against the service before and after a change to compare.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def worker(client: httpx.AsyncClient, path: str, remaining: list, latencies: list, errors: list):
+    while remaining:
+        remaining.pop()
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url: str, path: str, requests: int, concurrency: int, headers: dict) -> None:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30, headers=headers) as client:
+        await client.get(path)  # warm up the connection pool and server caches
+        remaining = list(range(requests))
+        latencies: list = []
+        errors: list = []
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, path, remaining, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{path}: {requests} requests, concurrency {concurrency}, {elapsed:.2f}s")
+    print(f"  requests/sec: {requests / elapsed:10.1f}")
+    print(f"  p50:          {percentile(latencies, 50) * 1000:10.2f} ms")
+    print(f"  p90:          {percentile(latencies, 90) * 1000:10.2f} ms")
+    print(f"  p99:          {percentile(latencies, 99) * 1000:10.2f} ms")
+    print(f"  mean:         {statistics.fmean(latencies) * 1000:10.2f} ms")
+    print(f"  errors:       {len(errors):10d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/signals")
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--header", action="append", default=[], help="Extra header as 'Name: value'")
+    args = parser.parse_args()
+
+    headers = dict(header.split(": ", 1) for header in args.header)
+    asyncio.run(run(args.url, args.path, args.requests, args.concurrency, headers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Synthetic listings shaped like the production data, for the benchmarks.
+
+Volume is skewed across asset types (mostly watches, few jets) and, within
+each type, across references (Zipf), so there are many short series and a
+few very long ones. A small share of listings are discounted (deals) and a
+small share carry unparseable prices, as scraped data does.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_ingest.browse_ai_ingest import Asset, JetAsset, WatchAsset, WineAsset
+
+ASSET_TYPES = [("watch", WatchAsset, 0.70), ("wine", WineAsset, 0.25), ("private_jet", JetAsset, 0.05)]
+BRANDS = {
+    "watch": ["rolex", "omega", "patek", "audemars", "cartier", "tudor"],
+    "wine": ["petrus", "lafite", "margaux", "latour", "romanee"],
+    "private_jet": ["gulfstream", "bombardier", "dassault", "embraer"],
+}
+BASE_PRICE = {"watch": 9.0, "wine": 7.0, "private_jet": 15.0} # log-space
+SPAN = timedelta(days=34) # inside the analytics job's 35-day lookback
+# Anchored to today so the lookback filters keep every row; results only depend on relative times
+START = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - SPAN
+DEAL_SHARE = 0.02
+BAD_PRICE_SHARE = 0.01
+ZIPF_A = 1.3
+
+
+def parse_size(text: str) -> int:
+    """'10k' -> 10_000, '1M' -> 1_000_000."""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def draw(rng: np.random.Generator, first: int, count: int, total: int, series_per_type: int) -> dict:
+    """Vectorized sample of `count` listings, positions first..first+count of a time-ordered run of `total`."""
+    weights = np.array([w for _, _, w in ASSET_TYPES])
+    type_codes = rng.choice(len(ASSET_TYPES), size=count, p=weights / weights.sum())
+    references = np.minimum(rng.zipf(ZIPF_A, size=count), series_per_type) - 1
+    brand_codes = references % 4
+
+    base = np.array([BASE_PRICE[name] for name, _, _ in ASSET_TYPES])[type_codes]
+    # Each reference has its own stable price level
+    level = base + ((references * 2654435761) % 1000) / 1000.0
+    price = np.exp(level + rng.normal(0, 0.1, size=count))
+    price[rng.random(count) < DEAL_SHARE] *= 0.7
+
+    positions = np.arange(first, first + count)
+    offsets = (positions / max(total, 1)) * SPAN.total_seconds()
+    timestamps = pd.Timestamp(START) + pd.to_timedelta(offsets, unit="s")
+    return {
+        "type_codes": type_codes,
+        "references": references,
+        "brand_codes": brand_codes,
+        "price": price,
+        "timestamps": timestamps,
+        "bad_price": rng.random(count) < BAD_PRICE_SHARE,
+    }
+
+
+def listings_frame(rows: int, seed: int = 0, series_per_type: int = 100_000) -> pd.DataFrame:
+    """The listings window as the analytics job loads it (typed, time-ordered, series-keyed)."""
+    rng = np.random.default_rng(seed)
+    sample = draw(rng, 0, rows, rows, series_per_type)
+    names = np.array([name for name, _, _ in ASSET_TYPES])
+    asset_type = names[sample["type_codes"]]
+    brand = _brands(asset_type, sample["brand_codes"])
+    series_key = pd.Series(asset_type).str.cat([brand, pd.Series(sample["references"]).astype(str)], sep="/")
+    df = pd.DataFrame({
+        "asset_type": pd.Categorical(asset_type),
+        "series_key": pd.Categorical(series_key),
+        "ingestion_timestamp": sample["timestamps"],
+        "price": np.where(sample["bad_price"], np.nan, sample["price"]),
+    })
+    # Unparseable prices never leave BigQuery (SAFE_CAST ... IS NOT NULL)
+    return df.dropna(subset=["price"]).reset_index(drop=True)
+
+
+def _brands(asset_type: np.ndarray, brand_codes: np.ndarray) -> pd.Series:
+    out = np.empty(len(asset_type), dtype=object)
+    for name, choices in BRANDS.items():
+        mask = asset_type == name
+        out[mask] = np.array(choices, dtype=object)[brand_codes[mask] % len(choices)]
+    return pd.Series(out)
+
+
+def captured_pages(
+    items: int, page_size: int = 1_000, seed: int = 0, series_per_type: int = 100_000
+) -> Iterator[Tuple[str, type[Asset], List[dict]]]:
+    """
+    Browse AI captured-list pages, (asset_type, asset_model, items) as
+    iter_robot_pages yields them, generated lazily one page at a time.
+    """
+    rng = np.random.default_rng(seed)
+    for first in range(0, items, page_size):
+        count = min(page_size, items - first)
+        sample = draw(rng, first, count, items, series_per_type)
+        for code, (name, model, _) in enumerate(ASSET_TYPES):
+            mask = sample["type_codes"] == code
+            if not mask.any():
+                continue
+            brands = BRANDS[name]
+            page = [
+                {
+                    "price": "POA" if bad else f"{price:.2f}",
+                    "brand": brands[brand % len(brands)],
+                    "reference": f"REF-{reference}",
+                    "condition": "used",
+                    "captured_at": timestamp.isoformat(),
+                }
+                for price, bad, brand, reference, timestamp in zip(
+                    sample["price"][mask], sample["bad_price"][mask], sample["brand_codes"][mask],
+                    sample["references"][mask], sample["timestamps"][mask], strict=True,
+                )
+            ]
+            yield name, model, page
+
+
+def signal_rows(count: int, seed: int = 0) -> pd.DataFrame:
+    """calculate_signals output for `count` distinct series, as upsert_signals_to_postgres receives it."""
+    rng = np.random.default_rng(seed)
+    mean = np.exp(rng.normal(9, 1, size=count))
+    std = mean * 0.1
+    price = mean + rng.normal(0, 1.5, size=count) * std
+    z_score = (price - mean) / std
+    return pd.DataFrame({
+        "asset_type": [f"series_{i:08d}" for i in range(count)],
+        "price": price,
+        "rolling_mean_30d": mean,
+        "z_score": z_score,
+        "is_deal": (price <= mean * 0.9) | (z_score <= -2.0),
+    })
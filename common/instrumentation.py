@@ -0,0 +1,290 @@
+"""
+Lightweight instrumentation shared by every CALIF entry point: timing spans,
+counters, peak-memory sampling, an opt-in cProfile hook, structured (JSON)
+logs and a Prometheus text rendering of the metrics.
+
+    with instrumentation.invocation("process_signals", profile=wanted):
+        with instrumentation.span("upsert"):
+            ...
+        instrumentation.count("rows_upserted", len(df), table="signals")
+
+Each invocation ends with one summary log line (duration, peak RSS, the time
+spent in each span and the counters it bumped), which Cloud Logging parses
+into jsonPayload for log-based metrics. Long-running processes (the API)
+also serve render_prometheus() for scraping. Standard library only.
+"""
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+# --- Configuration ---
+SERVICE = os.getenv("K_SERVICE", "calif") # set by Cloud Run and Cloud Functions
+LOG_FORMAT = os.getenv("INSTRUMENT_LOG_FORMAT", "json") # "json" (structured) or "text"
+PROFILE_MODE = os.getenv("PROFILE_MODE", "off") # "off", "request" (invocations that ask for it) or "always"
+PROFILE_DIR = os.getenv("PROFILE_DIR") # also dump .prof files here for snakeviz / pstats
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "25")) # functions listed in the profile log line
+METRIC_PREFIX = "calif"
+SPAN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0) # seconds
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# --- Memory ---
+def peak_rss_bytes() -> int:
+    """High-water mark of this process's resident memory."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # KiB on Linux
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident memory right now, where /proc is available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+# --- Metrics Registry ---
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+class Registry:
+    """Process-wide counters and span-duration histograms, safe across threads."""
+
+    def __init__(self, buckets: Tuple[float, ...] = SPAN_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        self._histograms: Dict[Tuple[str, Labels], list] = {} # key -> [bucket counts..., sum, count]
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[(name, _labels(labels))] += value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0.0)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format (also read by OpenTelemetry collectors)."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        for (name, labels), values in histograms:
+            metric = f"{METRIC_PREFIX}_{name}_seconds"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            for bound, bucket_count in zip(self.buckets, values, strict=False):
+                lines.append(f"{metric}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {bucket_count}")
+            lines.append(f"{metric}_bucket{_format_labels(labels, (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {values[-2]:.6f}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {values[-1]}")
+        metric = f"{METRIC_PREFIX}_process_peak_rss_bytes"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {peak_rss_bytes()}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def render_prometheus() -> str:
+    return registry.render()
+
+# --- Invocations ---
+class Invocation:
+    """One run of an entry point: the counters it bumped and the time it spent per span."""
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.id = uuid.uuid4().hex[:16]
+        self.labels = dict(labels) # may be filled in before the invocation ends (e.g. the matched route)
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.spans: Dict[str, float] = defaultdict(float)
+
+_current: contextvars.ContextVar[Optional[Invocation]] = contextvars.ContextVar("calif_invocation", default=None)
+
+def current_invocation() -> Optional[Invocation]:
+    return _current.get()
+
+# --- Structured Logging ---
+def log(event: str, severity: str = "INFO", **fields):
+    """
+    Prints one log record. As JSON, Cloud Logging reads `severity` and
+    `message` and keeps the remaining fields queryable.
+    """
+    invocation = _current.get()
+    record = {"severity": severity, "message": event, "service": SERVICE}
+    if invocation is not None:
+        record["invocation"] = invocation.name
+        record["invocation_id"] = invocation.id
+    record.update(fields)
+    if LOG_FORMAT == "json":
+        print(json.dumps(record, default=str, separators=(",", ":")), flush=True)
+    else:
+        print(" ".join(f"{key}={value}" for key, value in record.items()), flush=True)
+
+# --- Counters and Spans ---
+def count(name: str, value: float = 1, **labels):
+    """Adds `value` to a counter, process-wide and for the current invocation."""
+    registry.inc(name, value, **labels)
+    invocation = _current.get()
+    if invocation is not None:
+        invocation.counters[name] += value
+
+@contextmanager
+def span(name: str, log_span: bool = True, **labels) -> Iterator[dict]:
+    """
+    Times the block into the `span` histogram and logs its duration and the
+    process's memory at the end. Labels become metric labels, so keep their
+    values few (a mode or a route, not a row count). Yields the label dict,
+    which may be extended before the block exits.
+    """
+    labels = dict(labels)
+    start = time.perf_counter()
+    peak_before = peak_rss_bytes()
+    error = None
+    try:
+        yield labels
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        registry.observe("span", seconds, span=name, **labels)
+        invocation = _current.get()
+        if invocation is not None:
+            invocation.spans[name] += seconds
+        if log_span:
+            peak = peak_rss_bytes()
+            rss = current_rss_bytes()
+            log(
+                "span",
+                severity="ERROR" if error else "INFO",
+                span=name,
+                seconds=round(seconds, 6),
+                peak_rss_mb=round(peak / 2**20, 1),
+                peak_rss_growth_mb=round((peak - peak_before) / 2**20, 1),
+                rss_mb=round(rss / 2**20, 1) if rss is not None else None,
+                error=error,
+                **labels,
+            )
+
+# --- Profiling ---
+_profile_lock = threading.Lock() # one profiler per process can be active
+
+def should_profile(requested: bool = False) -> bool:
+    return PROFILE_MODE == "always" or (PROFILE_MODE == "request" and requested)
+
+@contextmanager
+def profiled(name: str) -> Iterator[Optional[cProfile.Profile]]:
+    """
+    Runs the block under cProfile and logs its hottest functions by
+    cumulative time. If another block is already being profiled, runs
+    unprofiled instead. In async code the profile also covers whatever else
+    the event loop ran meanwhile.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+        stats = pstats.Stats(profiler)
+        top = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in sorted(
+            stats.stats.items(), key=lambda item: item[1][3], reverse=True
+        )[:PROFILE_TOP]:
+            top.append({
+                "function": f"{os.path.basename(filename)}:{line}({function})",
+                "calls": calls,
+                "total_seconds": round(total, 6),
+                "cumulative_seconds": round(cumulative, 6),
+            })
+        path = None
+        if PROFILE_DIR:
+            invocation = _current.get()
+            path = os.path.join(PROFILE_DIR, f"{name}-{invocation.id if invocation else uuid.uuid4().hex[:16]}.prof")
+            stats.dump_stats(path)
+        log("profile", span=name, top=top, path=path)
+    finally:
+        _profile_lock.release()
+
+@contextmanager
+def invocation(name: str, profile: bool = False, **labels) -> Iterator[Invocation]:
+    """
+    Wraps one run of an entry point: times it as a span, profiles it when
+    should_profile(profile) allows, and logs a summary when it ends. Also
+    usable as a decorator, in which case only PROFILE_MODE=always profiles.
+    """
+    current = Invocation(name, **labels)
+    token = _current.set(current)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        with span(name, log_span=False) as span_labels:
+            try:
+                if should_profile(profile):
+                    with profiled(name):
+                        yield current
+                else:
+                    yield current
+            finally:
+                span_labels.update(current.labels)
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        log("invocation", severity="ERROR" if status == "error" else "INFO", **{
+            **current.labels,
+            "status": status,
+            "seconds": round(time.perf_counter() - start, 6),
+            "peak_rss_mb": round(peak_rss_bytes() / 2**20, 1),
+            "spans": {key: round(value, 6) for key, value in current.spans.items()},
+            "counters": dict(current.counters),
+        })
+        _current.reset(token)
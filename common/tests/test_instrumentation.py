@@ -0,0 +1,91 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(instrumentation, "registry", instrumentation.Registry())
+    monkeypatch.setattr(instrumentation, "LOG_FORMAT", "json")
+
+def log_records(capsys) -> list:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+
+def test_invocation_summarizes_spans_and_counters(capsys):
+    """Test that an invocation logs one summary with its spans, counters and labels."""
+    with instrumentation.invocation("job", mode="full") as invocation:
+        with instrumentation.span("load"):
+            instrumentation.count("rows_loaded", 10, source="bigquery")
+            instrumentation.count("rows_loaded", 5, source="cache")
+        invocation.labels["status_code"] = 200
+
+    records = log_records(capsys)
+    span, summary = records[0], records[-1]
+    assert span["message"] == "span" and span["span"] == "load"
+    assert span["invocation_id"] == summary["invocation_id"]
+    assert summary["message"] == "invocation" and summary["status"] == "ok"
+    assert summary["counters"] == {"rows_loaded": 15}
+    assert set(summary["spans"]) == {"job", "load"}
+    assert summary["mode"] == "full" and summary["status_code"] == 200
+    assert instrumentation.registry.counter("rows_loaded", source="bigquery") == 10
+
+def test_invocation_logs_errors_and_reraises(capsys):
+    """Test that a failing invocation is logged with an error status and the exception propagates."""
+    with pytest.raises(RuntimeError):
+        with instrumentation.invocation("job"):
+            with instrumentation.span("upsert"):
+                raise RuntimeError("boom")
+
+    records = log_records(capsys)
+    assert records[0]["severity"] == "ERROR" and records[0]["error"] == "RuntimeError"
+    assert records[-1]["status"] == "error"
+
+def test_invocation_works_as_a_decorator(capsys):
+    """Test that each call of a decorated function is its own invocation."""
+    @instrumentation.invocation("handler")
+    def handler(value):
+        instrumentation.count("calls")
+        return value * 2
+
+    assert handler(2) == 4 and handler(3) == 6
+    summaries = [record for record in log_records(capsys) if record["message"] == "invocation"]
+    assert len(summaries) == 2
+    assert summaries[0]["invocation_id"] != summaries[1]["invocation_id"]
+    assert all(summary["counters"] == {"calls": 1} for summary in summaries)
+
+def test_prometheus_rendering():
+    """Test that counters and span histograms render in the Prometheus text format."""
+    instrumentation.count("slack_posts", 2, status="ok")
+    with instrumentation.span("upsert", log_span=False, table='si"gnals'):
+        pass
+
+    text = instrumentation.render_prometheus()
+    assert "# TYPE calif_slack_posts_total counter" in text
+    assert 'calif_slack_posts_total{status="ok"} 2' in text
+    assert "# TYPE calif_span_seconds histogram" in text
+    assert 'calif_span_seconds_bucket{span="upsert",table="si\\"gnals",le="+Inf"} 1' in text
+    assert 'calif_span_seconds_count{span="upsert",table="si\\"gnals"} 1' in text
+    assert "calif_process_peak_rss_bytes " in text
+
+def test_profiling_is_opt_in(monkeypatch, capsys):
+    """Test that a profile is only logged when PROFILE_MODE allows the invocation to ask for one."""
+    with instrumentation.invocation("job", profile=True):
+        sum(range(1000))
+    assert not any(record["message"] == "profile" for record in log_records(capsys))
+
+    monkeypatch.setattr(instrumentation, "PROFILE_MODE", "request")
+    with instrumentation.invocation("job", profile=False):
+        sum(range(1000))
+    assert not any(record["message"] == "profile" for record in log_records(capsys))
+
+    with instrumentation.invocation("job", profile=True):
+        sum(range(1000))
+    profiles = [record for record in log_records(capsys) if record["message"] == "profile"]
+    assert len(profiles) == 1 and profiles[0]["top"]
@@ -1,10 +1,12 @@
 import os
+import threading
+import time
 
 import altair as alt
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 
 load_dotenv()
 
@@ -33,19 +35,78 @@ def get_db_engine():
         return None
 
 # --- Data Loading ---
-@st.cache_data(ttl=60) # Cache data for 60 seconds
-def load_signals_data(_engine) -> pd.DataFrame:
-    """Loads deal signals from the Postgres database."""
-    if _engine is None:
+SIGNAL_COLUMNS = ["asset_type", "last_price", "rolling_mean_30d", "z_score", "is_deal", "updated_at"]
+REFRESH_INTERVAL = 60 # seconds between incremental fetches, shared by all viewers
+WATERMARK_OVERLAP = pd.Timedelta(minutes=5) # re-read recent rows in case an upsert committed late
+
+# Only rows changed since the last fetch; deals that stopped being deals are
+# fetched too so they can be dropped from the held frame.
+DELTA_QUERY = text(
+    f"SELECT {', '.join(SIGNAL_COLUMNS)} FROM signals WHERE updated_at >= :since"
+)
+FULL_QUERY = text(
+    f"SELECT {', '.join(SIGNAL_COLUMNS)} FROM signals WHERE is_deal = TRUE"
+)
+METRICS_QUERY = text(
+    "SELECT count(*) AS total_deals, count(DISTINCT asset_type) AS asset_classes, max(updated_at) AS last_updated "
+    "FROM signals WHERE is_deal = TRUE"
+)
+
+class SignalsStore:
+    """
+    Process-wide frame of current deals, refreshed incrementally by
+    `updated_at`. Shared across sessions, so concurrent viewers trigger at
+    most one small delta query per REFRESH_INTERVAL instead of full scans.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frame = pd.DataFrame(columns=SIGNAL_COLUMNS)
+        self.watermark = None
+        self.fetched_at = float("-inf")
+        self.last_load_seconds = 0.0
+        self.last_load_rows = 0
+
+    def refresh(self, engine) -> pd.DataFrame:
+        with self.lock:
+            if time.monotonic() - self.fetched_at < REFRESH_INTERVAL:
+                return self.frame
+            start = time.perf_counter()
+            with engine.connect() as connection:
+                if self.watermark is None:
+                    delta = pd.read_sql(FULL_QUERY, connection)
+                else:
+                    delta = pd.read_sql(DELTA_QUERY, connection, params={"since": (self.watermark - WATERMARK_OVERLAP).to_pydatetime()})
+            if not delta.empty:
+                merged = pd.concat([self.frame[~self.frame['asset_type'].isin(delta['asset_type'])], delta], ignore_index=True)
+                self.frame = merged[merged['is_deal'].astype(bool)].sort_values('updated_at', ascending=False, ignore_index=True)
+                latest = pd.to_datetime(delta['updated_at']).max()
+                self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+            self.fetched_at = time.monotonic()
+            self.last_load_seconds = time.perf_counter() - start
+            self.last_load_rows = len(delta)
+            return self.frame
+
+@st.cache_resource
+def get_signals_store() -> SignalsStore:
+    return SignalsStore()
+
+def load_signals_data(engine) -> pd.DataFrame:
+    """Returns the current deal signals, fetching only rows changed since the last load."""
+    if engine is None:
         return pd.DataFrame()
     try:
-        query = "SELECT * FROM signals WHERE is_deal = TRUE ORDER BY updated_at DESC"
-        df = pd.read_sql(query, _engine)
-        return df
+        return get_signals_store().refresh(engine)
     except Exception as e:
         st.warning(f"Could not load signals data. The 'signals' table may not exist yet. Error: {e}")
         return pd.DataFrame()
 
+@st.cache_data(ttl=REFRESH_INTERVAL)
+def load_metrics(_engine) -> dict:
+    """Deal metrics aggregated in Postgres rather than over the loaded frame."""
+    with _engine.connect() as connection:
+        return dict(connection.execute(METRICS_QUERY).mappings().one())
+
 
 # --- Main Dashboard UI ---
 def main():
@@ -57,13 +118,14 @@ def main():
 
     if not signals_df.empty:
         # --- Display Metrics ---
+        metrics = load_metrics(engine)
         col1, col2, col3 = st.columns(3)
-        col1.metric("Total Deals", len(signals_df))
-        if 'asset_type' in signals_df.columns:
-            col2.metric("Asset Classes with Deals", signals_df['asset_type'].nunique())
-        if 'updated_at' in signals_df.columns:
-            latest_update = pd.to_datetime(signals_df['updated_at']).max()
-            col3.metric("Last Updated", latest_update.strftime("%Y-%m-%d %H:%M:%S UTC"))
+        col1.metric("Total Deals", metrics["total_deals"])
+        col2.metric("Asset Classes with Deals", metrics["asset_classes"])
+        if metrics["last_updated"] is not None:
+            col3.metric("Last Updated", pd.to_datetime(metrics["last_updated"]).strftime("%Y-%m-%d %H:%M:%S UTC"))
+        store = get_signals_store()
+        st.caption(f"Last load: {store.last_load_rows} changed rows in {store.last_load_seconds * 1000:.0f} ms")
 
         st.markdown("---")
 
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+import httpx
+
+# --- Configuration ---
+BROWSE_AI_BASE_URL = os.getenv("BROWSE_AI_BASE_URL", "https://api.browse.ai") # e.g. http://localhost:8080 for the simulator
+FETCH_CONCURRENCY = int(os.getenv("BROWSE_AI_CONCURRENCY", "16"))
+FETCH_TIMEOUT = float(os.getenv("BROWSE_AI_TIMEOUT", "30"))
+FETCH_RETRIES = int(os.getenv("BROWSE_AI_RETRIES", "3"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+@dataclass
+class RobotFetch:
+    """Outcome of fetching the latest task of one robot."""
+    robot_id: str
+    data: Optional[Dict[str, Any]]
+    latency: float
+    attempts: int
+    error: Optional[str] = None
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff, honouring a numeric Retry-After header."""
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+# --- Async Fetching ---
+async def fetch_latest_run(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    robot_id: str,
+    retries: int = FETCH_RETRIES,
+) -> RobotFetch:
+    """
+    Fetches the latest task of a robot, retrying timeouts, connection errors,
+    429s and 5xx responses. Other HTTP errors fail immediately.
+    """
+    start = time.perf_counter()
+    error = None
+    for attempt in range(retries + 1):
+        retry_after = None
+        async with semaphore:
+            try:
+                response = await client.get(f"/v2/robots/{robot_id}/tasks/latest")
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return RobotFetch(robot_id, response.json(), time.perf_counter() - start, attempt + 1)
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+            except httpx.HTTPStatusError as e:
+                return RobotFetch(robot_id, None, time.perf_counter() - start, attempt + 1, str(e))
+            except (httpx.TransportError, ValueError) as e:
+                error = f"{type(e).__name__}: {e}"
+        if attempt < retries:
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+    return RobotFetch(robot_id, None, time.perf_counter() - start, retries + 1, error)
+
+async def fetch_all_runs(
+    api_key: str,
+    robot_ids: Iterable[str],
+    concurrency: int = FETCH_CONCURRENCY,
+    timeout: float = FETCH_TIMEOUT,
+    retries: int = FETCH_RETRIES,
+    base_url: str = BROWSE_AI_BASE_URL,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> Dict[str, RobotFetch]:
+    """Fetches every robot concurrently over one pooled client."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {api_key}"},
+        timeout=httpx.Timeout(timeout),
+        limits=limits,
+        transport=transport,
+    ) as client:
+        results = await asyncio.gather(
+            *(fetch_latest_run(client, semaphore, robot_id, retries) for robot_id in robot_ids)
+        )
+    return {result.robot_id: result for result in results}
+
+def fetch_latest_runs(api_key: str, robot_ids: Iterable[str], **kwargs) -> Dict[str, RobotFetch]:
+    """
+    Synchronous entrypoint: fetches all robots at once and logs per-robot latency.
+    Keyword arguments are passed through to fetch_all_runs.
+    """
+    start = time.perf_counter()
+    results = asyncio.run(fetch_all_runs(api_key, list(robot_ids), **kwargs))
+    for result in results.values():
+        status = "ok" if result.error is None else f"failed ({result.error})"
+        print(f"Robot {result.robot_id}: {status} in {result.latency:.2f}s after {result.attempts} attempt(s)")
+    print(f"Fetched {len(results)} robots in {time.perf_counter() - start:.2f}s.")
+    return results
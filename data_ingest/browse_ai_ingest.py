@@ -1,11 +1,24 @@
+import gzip
+import itertools
+import json
 import os
+import tempfile
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
 
-import requests
 from dotenv import load_dotenv
 from google.cloud import bigquery
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+from common import instrumentation
+
+try:
+    from .browse_ai_client import fetch_latest_runs
+    from .dedup import DEDUP_DB_PATH, SeenIndex, content_hash, dedupe_rows
+except ImportError:  # Run directly as a script
+    from browse_ai_client import fetch_latest_runs
+    from dedup import DEDUP_DB_PATH, SeenIndex, content_hash, dedupe_rows
 
 load_dotenv()
 
@@ -14,6 +27,14 @@ BROWSE_AI_API_KEY = os.getenv("BROWSE_AI_API_KEY")
 GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
 BIGQUERY_DATASET = "calif_raw"
 BIGQUERY_TABLE = "listings"
+PAGE_SIZE = int(os.getenv("INGEST_PAGE_SIZE", "1000"))
+MAX_BATCH_ROWS = int(os.getenv("INGEST_BATCH_ROWS", "500"))
+# insert_rows_json requests are capped at 10 MB; leave headroom for the envelope
+MAX_BATCH_BYTES = int(os.getenv("INGEST_BATCH_BYTES", str(5 * 1024 * 1024)))
+VALIDATION_MODE = os.getenv("INGEST_VALIDATION", "batch") # "batch" or "model" (per-item Pydantic models)
+WRITE_MODE = os.getenv("INGEST_WRITE_MODE", "auto") # "auto", "stream" (insert_rows_json) or "load" (batch load job)
+LOAD_JOB_THRESHOLD = int(os.getenv("INGEST_LOAD_JOB_THRESHOLD", "10000")) # "auto" switches to a load job above this many rows
+LOAD_MAX_BAD_RECORDS = int(os.getenv("INGEST_LOAD_MAX_BAD_RECORDS", "100"))
 
 # --- Pydantic Models for Data Validation ---
 
@@ -35,46 +56,243 @@ class JetAsset(Asset):
     asset_type: str = "private_jet"
     source_api: str = "charter_api"
 
-# --- Browse AI API Interaction ---
-
-def get_latest_browse_ai_runs(api_key: str, robot_id: str) -> Optional[Dict[str, Any]]:
-    """
-    Fetches the latest successful run from a Browse AI robot.
-    """
-    url = f"https://api.browse.ai/v2/robots/{robot_id}/tasks/latest"
-    headers = {"Authorization": f"Bearer {api_key}"}
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data from Browse AI for robot {robot_id}: {e}")
-        return None
-
 # --- Data Streaming to BigQuery ---
 
-def stream_to_bigquery(project_id: str, dataset: str, table: str, rows: List[Dict[str, Any]]):
+def stream_to_bigquery(
+    project_id: str,
+    dataset: str,
+    table: str,
+    rows: List[Dict[str, Any]],
+    client: Optional[bigquery.Client] = None,
+    row_ids: Optional[List[str]] = None,
+) -> Set[int]:
     """
     Streams data into a BigQuery table.
+    Pass `client` to reuse one connection across batches, and `row_ids` to set
+    insertIds so retried inserts are deduplicated by BigQuery.
+    Returns the indexes of the rows that failed to insert.
     """
     if not rows:
         print("No rows to stream. Skipping.")
-        return
+        return set()
 
-    client = bigquery.Client(project=project_id)
+    client = client or bigquery.Client(project=project_id)
     table_ref = client.dataset(dataset).table(table)
 
     try:
-        errors = client.insert_rows_json(table_ref, rows)
+        errors = client.insert_rows_json(table_ref, rows, row_ids=row_ids)
         if errors:
             print(f"Encountered errors while inserting rows: {errors}")
-        else:
-            print(f"Successfully streamed {len(rows)} rows to {dataset}.{table}")
+            return {error["index"] for error in errors}
+        print(f"Successfully streamed {len(rows)} rows to {dataset}.{table}")
+        return set()
     except Exception as e:
         print(f"An error occurred during BigQuery streaming: {e}")
+        return set(range(len(rows)))
+
+# --- Batch Loading to BigQuery ---
+
+def load_to_bigquery(
+    project_id: str,
+    dataset: str,
+    table: str,
+    rows: Iterable[Dict[str, Any]],
+    client: Optional[bigquery.Client] = None,
+    max_bad_records: int = LOAD_MAX_BAD_RECORDS,
+) -> Tuple[int, List[str], bool]:
+    """
+    Writes rows to a gzip-compressed NDJSON temp file and submits a single
+    load job. Cheaper than streaming for bulk runs and free of per-request
+    size limits. Up to `max_bad_records` rows may be rejected; each rejection
+    is reported from the job's errors.
+    Returns (rows_written, content_hashes, all_loaded). all_loaded is False
+    when the job failed or rejected any row; the job's errors do not say
+    reliably which rows, so none of the hashes are known to be written then.
+    """
+    client = client or bigquery.Client(project=project_id)
+    table_ref = client.dataset(dataset).table(table)
+    row_hashes: List[str] = []
+
+    with tempfile.TemporaryFile() as buffer:
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as compressed:
+            for row in rows:
+                compressed.write(json.dumps(row, separators=(",", ":")).encode("utf-8"))
+                compressed.write(b"\n")
+                row_hashes.append(content_hash(row))
+        if not row_hashes:
+            print("No rows to load. Skipping.")
+            return 0, [], True
+
+        print(f"Loading {len(row_hashes)} rows ({buffer.tell() / 1024:,.0f} KiB compressed) to {dataset}.{table}...")
+        buffer.seek(0)
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            max_bad_records=max_bad_records,
+        )
+        start = time.perf_counter()
+        try:
+            job = client.load_table_from_file(buffer, table_ref, job_config=job_config)
+            job.result()
+        except Exception as e:
+            print(f"An error occurred during the BigQuery load job: {e}")
+            for error in getattr(e, "errors", None) or []:
+                print(f"Load error: {error}")
+            return 0, row_hashes, False
+
+    elapsed = time.perf_counter() - start
+    for error in job.errors or []:
+        print(f"Rejected row: {error}")
+    written = job.output_rows if job.output_rows is not None else len(row_hashes)
+    print(f"Successfully loaded {written} rows to {dataset}.{table} in {elapsed:.2f}s ({written / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return written, row_hashes, not job.errors and written >= len(row_hashes)
+
+# --- Ingestion Pipeline Stages ---
+
+def iter_robot_pages(
+    robots: Dict[str, Tuple[str, Type[Asset]]],
+    fetches: Dict[str, Any],
+    page_size: int = PAGE_SIZE,
+) -> Iterator[Tuple[str, Type[Asset], List[Dict[str, Any]]]]:
+    """
+    Yields (asset_type, asset_model, page) for each page of every robot's
+    captured list. A robot's payload is released once its pages are consumed.
+    """
+    for robot_id, (asset_type, asset_model) in robots.items():
+        fetch = fetches.pop(robot_id, None)
+        run_data = fetch.data if fetch else None
+
+        if run_data and run_data.get("successful") and "capturedLists" in run_data.get("result", {}):
+            items = run_data["result"]["capturedLists"].get("default", [])
+            print(f"Found {len(items)} items for {asset_type}.")
+            instrumentation.count("rows_loaded", len(items), source="browse_ai", asset_type=asset_type)
+            for start in range(0, len(items), page_size):
+                yield asset_type, asset_model, items[start:start + page_size]
+        else:
+            print(f"No successful run or no data found for {asset_type}.")
+
+def validate_pages(pages: Iterable[Tuple[str, Type[Asset], List[Dict[str, Any]]]]) -> Iterator[Asset]:
+    """Validates every captured item, skipping (and logging) invalid ones."""
+    for asset_type, asset_model, page in pages:
+        for item in page:
+            try:
+                yield asset_model(raw_data=item)
+            except ValidationError as e:
+                print(f"Validation error for an item of type {asset_type}: {e}")
+                instrumentation.count("rows_dropped", reason="validation", asset_type=asset_type)
+
+# Validates a whole page of captured items in a single compiled call
+ITEMS_ADAPTER = TypeAdapter(List[Dict[str, Any]])
+TIMESTAMP_ADAPTER = TypeAdapter(datetime)
+
+def validate_page_rows(
+    asset_type: str,
+    asset_model: Type[Asset],
+    page: List[Any],
+    ingestion_timestamp: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fast-path equivalent of validate_pages + serialize_assets for one page.
+    Produces the same JSON-ready rows without building a model per item; the
+    page shares one ingestion timestamp.
+    """
+    try:
+        items = ITEMS_ADAPTER.validate_python(page)
+    except ValidationError as e:
+        invalid = {error["loc"][0] for error in e.errors() if error["loc"]}
+        print(f"Validation error for {len(invalid)} items of type {asset_type}: {e}")
+        instrumentation.count("rows_dropped", len(invalid), reason="validation", asset_type=asset_type)
+        items = [item for index, item in enumerate(page) if index not in invalid]
+
+    fields = asset_model.model_fields
+    stamp = TIMESTAMP_ADAPTER.dump_python(ingestion_timestamp or datetime.utcnow(), mode="json")
+    row_asset_type = fields["asset_type"].default
+    source_api = fields["source_api"].default
+    return [
+        {"asset_type": row_asset_type, "source_api": source_api, "ingestion_timestamp": stamp, "raw_data": item}
+        for item in items
+    ]
+
+def validate_pages_fast(pages: Iterable[Tuple[str, Type[Asset], List[Dict[str, Any]]]]) -> Iterator[Dict[str, Any]]:
+    """Batch-validates each page and yields JSON-ready rows."""
+    for asset_type, asset_model, page in pages:
+        yield from validate_page_rows(asset_type, asset_model, page)
+
+def serialize_assets(assets: Iterable[Asset]) -> Iterator[Dict[str, Any]]:
+    """Dumps validated assets to JSON-ready rows."""
+    for asset in assets:
+        yield asset.model_dump(mode="json")
+
+def batch_rows(
+    rows: Iterable[Dict[str, Any]],
+    max_rows: int = MAX_BATCH_ROWS,
+    max_bytes: int = MAX_BATCH_BYTES,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Groups rows into batches bounded by row count and encoded JSON size, so no
+    single insert exceeds BigQuery's per-request streaming limits.
+    """
+    batch: List[Dict[str, Any]] = []
+    batch_bytes = 0
+    for row in rows:
+        row_bytes = len(json.dumps(row, separators=(",", ":")).encode("utf-8"))
+        if batch and (len(batch) >= max_rows or batch_bytes + row_bytes > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(row)
+        batch_bytes += row_bytes
+    if batch:
+        yield batch
+
+def write_rows(rows: Iterable[Dict[str, Any]], client: bigquery.Client, seen_index: Optional[SeenIndex] = None) -> int:
+    """
+    Writes rows to BigQuery by streaming batches, or with a single load job
+    when WRITE_MODE asks for it or "auto" sees more than LOAD_JOB_THRESHOLD rows.
+    Written rows are recorded in `seen_index`. Returns the number of rows written.
+    """
+    # Only the first LOAD_JOB_THRESHOLD + 1 rows are buffered to make the choice
+    head = list(itertools.islice(rows, LOAD_JOB_THRESHOLD + 1))
+    use_load_job = WRITE_MODE == "load" or (WRITE_MODE == "auto" and len(head) > LOAD_JOB_THRESHOLD)
+    rows = itertools.chain(head, rows)
+    del head
+
+    if use_load_job:
+        written, row_hashes, all_loaded = load_to_bigquery(
+            project_id=GCP_PROJECT_ID,
+            dataset=BIGQUERY_DATASET,
+            table=BIGQUERY_TABLE,
+            rows=rows,
+            client=client,
+        )
+        # With rejected rows we cannot tell which were written, so none are marked
+        # and the next run offers them all again
+        if seen_index and all_loaded:
+            seen_index.mark_seen(row_hashes)
+        instrumentation.count("rows_written", written, method="load")
+        instrumentation.count("rows_failed", len(row_hashes) - written, method="load")
+        return written
+
+    written = 0
+    for batch in batch_rows(rows):
+        row_ids = [content_hash(row) for row in batch]
+        failed = stream_to_bigquery(
+            project_id=GCP_PROJECT_ID,
+            dataset=BIGQUERY_DATASET,
+            table=BIGQUERY_TABLE,
+            rows=batch,
+            client=client,
+            row_ids=row_ids,
+        )
+        if seen_index:
+            seen_index.mark_seen(row_id for index, row_id in enumerate(row_ids) if index not in failed)
+        written += len(batch) - len(failed)
+        instrumentation.count("rows_written", len(batch) - len(failed), method="stream")
+        instrumentation.count("rows_failed", len(failed), method="stream")
+    return written
 
 # --- Main Ingestion Logic ---
 
+@instrumentation.invocation("ingest")
 def main():
     """
     Main function to orchestrate data ingestion.
@@ -91,38 +309,42 @@ def main():
         "charterapi_robot_id": ("jet", JetAsset),
     }
 
-    all_assets_to_stream = []
-
+    robots = {}
     for robot_id_str, (asset_type, asset_model) in source_map.items():
         robot_id = os.getenv(robot_id_str.upper())
         if not robot_id:
             print(f"Skipping {asset_type}: {robot_id_str.upper()} not found in .env")
             continue
+        robots[robot_id] = (asset_type, asset_model)
 
-        print(f"Fetching data for asset type: {asset_type}...")
-        run_data = get_latest_browse_ai_runs(BROWSE_AI_API_KEY, robot_id)
+    # Fetch every robot concurrently; wall time tracks the slowest robot
+    print(f"Fetching data for {len(robots)} robots...")
+    with instrumentation.span("fetch"):
+        fetches = fetch_latest_runs(BROWSE_AI_API_KEY, robots)
 
-        if run_data and run_data.get("successful") and "capturedLists" in run_data.get("result", {}):
-            items = run_data["result"]["capturedLists"].get("default", [])
-            print(f"Found {len(items)} items for {asset_type}.")
+    # pages -> validate -> serialize -> dedupe -> batch, flushing each batch as it fills
+    client = bigquery.Client(project=GCP_PROJECT_ID)
+    pages = iter_robot_pages(robots, fetches)
+    if VALIDATION_MODE == "model":
+        rows = serialize_assets(validate_pages(pages))
+    else:
+        rows = validate_pages_fast(pages)
 
-            for item in items:
-                try:
-                    asset = asset_model(raw_data=item)
-                    all_assets_to_stream.append(asset.model_dump(mode="json"))
-                except ValidationError as e:
-                    print(f"Validation error for an item of type {asset_type}: {e}")
-        else:
-            print(f"No successful run or no data found for {asset_type}.")
+    seen_index = None
+    if DEDUP_DB_PATH:
+        seen_index = SeenIndex(DEDUP_DB_PATH)
+        print(f"Evicted {seen_index.evict_expired()} expired listing hashes.")
+        rows = dedupe_rows(rows, seen_index)
 
-    if all_assets_to_stream:
-        stream_to_bigquery(
-            project_id=GCP_PROJECT_ID,
-            dataset=BIGQUERY_DATASET,
-            table=BIGQUERY_TABLE,
-            rows=all_assets_to_stream
-        )
-    else:
+    try:
+        # Validation and dedup run lazily inside the write, so this span covers them too
+        with instrumentation.span("write"):
+            streamed = write_rows(rows, client, seen_index)
+    finally:
+        if seen_index:
+            seen_index.close()
+
+    if not streamed:
         print("No new data to stream to BigQuery.")
 
     print("CALIF data ingestion finished.")
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List
+
+from common import instrumentation
+
+# --- Configuration ---
+DEDUP_DB_PATH = os.getenv("INGEST_DEDUP_DB", ".cache/ingest_seen.sqlite3") # empty disables deduplication
+DEDUP_TTL_DAYS = float(os.getenv("INGEST_DEDUP_TTL_DAYS", "7"))
+LOOKUP_CHUNK_SIZE = 500
+
+# --- Hashing ---
+def content_hash(row: Dict[str, Any]) -> str:
+    """
+    Hashes a row's asset type and canonicalized raw_data, ignoring the
+    ingestion timestamp, so a re-scraped unchanged listing hashes the same.
+    """
+    canonical = json.dumps(
+        [row["asset_type"], row["source_api"], row["raw_data"]],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+# --- Seen Index ---
+class SeenIndex:
+    """Persistent set of listing hashes with TTL eviction, backed by SQLite."""
+
+    def __init__(self, path: str = DEDUP_DB_PATH, ttl_days: float = DEDUP_TTL_DAYS):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ttl_seconds = ttl_days * 86400
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen (hash TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS seen_at_idx ON seen (seen_at)")
+        self.connection.commit()
+
+    def evict_expired(self) -> int:
+        """Forgets hashes older than the TTL so those listings are streamed again."""
+        cursor = self.connection.execute("DELETE FROM seen WHERE seen_at < ?", (time.time() - self.ttl_seconds,))
+        self.connection.commit()
+        return cursor.rowcount
+
+    def seen(self, hashes: List[str]) -> set:
+        """Returns the subset of `hashes` already in the index."""
+        placeholders = ",".join("?" * len(hashes))
+        cursor = self.connection.execute(f"SELECT hash FROM seen WHERE hash IN ({placeholders})", hashes)
+        return {row[0] for row in cursor}
+
+    def mark_seen(self, hashes: Iterable[str]):
+        now = time.time()
+        self.connection.executemany(
+            "INSERT INTO seen (hash, seen_at) VALUES (?, ?) ON CONFLICT(hash) DO UPDATE SET seen_at = excluded.seen_at",
+            ((h, now) for h in hashes),
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+# --- Pipeline Stage ---
+def dedupe_rows(rows: Iterable[Dict[str, Any]], index: SeenIndex, chunk_size: int = LOOKUP_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Drops rows whose content hash is already in the index, or repeats within
+    this run. Lookups are batched `chunk_size` rows at a time. Rows are marked
+    seen by the caller once they have been written.
+    """
+    run_hashes: set = set()
+    skipped = 0
+    chunk: List[Dict[str, Any]] = []
+
+    def flush(chunk):
+        nonlocal skipped
+        hashes = [content_hash(row) for row in chunk]
+        known = index.seen(list(set(hashes)))
+        for row, row_hash in zip(chunk, hashes, strict=True):
+            if row_hash in known or row_hash in run_hashes:
+                skipped += 1
+                continue
+            run_hashes.add(row_hash)
+            yield row
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from flush(chunk)
+            chunk = []
+    if chunk:
+        yield from flush(chunk)
+    print(f"Deduplication skipped {skipped} unchanged listings.")
+    instrumentation.count("rows_dropped", skipped, reason="duplicate")
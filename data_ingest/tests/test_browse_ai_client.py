@@ -0,0 +1,55 @@
+import os
+import sys
+
+import httpx
+import pytest
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_ingest import browse_ai_client
+from data_ingest.browse_ai_client import fetch_latest_runs
+
+RUN = {"successful": True, "result": {"capturedLists": {"default": [{"price": 15000}]}}}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    """Skip real sleeping between retries."""
+    monkeypatch.setattr(browse_ai_client, "backoff_delay", lambda attempt, retry_after=None: 0)
+
+def test_fetches_all_robots():
+    """Test that every robot is fetched and its payload returned."""
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=RUN))
+    results = fetch_latest_runs("key", ["a", "b", "c"], transport=transport)
+    assert set(results) == {"a", "b", "c"}
+    assert all(result.data == RUN and result.attempts == 1 for result in results.values())
+
+def test_retries_server_errors():
+    """Test that 5xx responses are retried until one succeeds."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503) if len(calls) < 3 else httpx.Response(200, json=RUN)
+
+    results = fetch_latest_runs("key", ["a"], transport=httpx.MockTransport(handler), retries=3)
+    assert results["a"].data == RUN
+    assert results["a"].attempts == 3
+
+def test_client_errors_are_not_retried():
+    """Test that a 404 fails immediately without retries."""
+    transport = httpx.MockTransport(lambda request: httpx.Response(404))
+    results = fetch_latest_runs("key", ["missing"], transport=transport, retries=3)
+    assert results["missing"].data is None
+    assert results["missing"].attempts == 1
+
+def test_timeouts_exhaust_retries():
+    """Test that a robot that keeps timing out is reported as failed."""
+    def handler(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    results = fetch_latest_runs("key", ["slow"], transport=httpx.MockTransport(handler), retries=2)
+    assert results["slow"].data is None
+    assert results["slow"].attempts == 3
+    assert "ReadTimeout" in results["slow"].error
@@ -0,0 +1,41 @@
+import os
+import sys
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_ingest.dedup import SeenIndex, content_hash, dedupe_rows
+
+
+def make_row(raw_data: dict, stamp: str = "2024-01-01T00:00:00") -> dict:
+    return {"asset_type": "watch", "source_api": "watchcharts", "ingestion_timestamp": stamp, "raw_data": raw_data}
+
+def test_hash_ignores_timestamp_and_key_order():
+    """Test that re-scraped unchanged listings hash identically."""
+    first = make_row({"price": 1, "model": "A"}, "2024-01-01T00:00:00")
+    second = make_row({"model": "A", "price": 1}, "2024-01-02T00:00:00")
+    assert content_hash(first) == content_hash(second)
+    assert content_hash(first) != content_hash(make_row({"price": 2, "model": "A"}))
+
+def test_dedupe_skips_seen_and_repeated_rows(tmp_path):
+    """Test that only new or changed listings pass through."""
+    index = SeenIndex(str(tmp_path / "seen.sqlite3"))
+    index.mark_seen([content_hash(make_row({"price": 1}))])
+
+    rows = [make_row({"price": 1}), make_row({"price": 2}), make_row({"price": 2}), make_row({"price": 3})]
+    kept = list(dedupe_rows(rows, index, chunk_size=2))
+    assert [row["raw_data"]["price"] for row in kept] == [2, 3]
+
+def test_seen_index_persists_and_expires(tmp_path):
+    """Test that hashes survive a reopen and are evicted after the TTL."""
+    path = str(tmp_path / "seen.sqlite3")
+    index = SeenIndex(path)
+    index.mark_seen(["abc"])
+    index.close()
+
+    reopened = SeenIndex(path)
+    assert reopened.seen(["abc", "def"]) == {"abc"}
+
+    expired = SeenIndex(path, ttl_days=-1)
+    assert expired.evict_expired() == 1
+    assert expired.seen(["abc"]) == set()
@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_ingest import browse_ai_ingest
+from data_ingest.browse_ai_client import RobotFetch
+from data_ingest.browse_ai_ingest import (
+    WatchAsset,
+    batch_rows,
+    iter_robot_pages,
+    serialize_assets,
+    validate_page_rows,
+    validate_pages,
+    write_rows,
+)
+
+
+def make_fetch(robot_id: str, items: list) -> RobotFetch:
+    data = {"successful": True, "result": {"capturedLists": {"default": items}}}
+    return RobotFetch(robot_id, data, latency=0.0, attempts=1)
+
+def test_pages_are_bounded_by_page_size():
+    """Test that a robot's captured list is split into pages."""
+    items = [{"price": i} for i in range(25)]
+    fetches = {"robot": make_fetch("robot", items)}
+    pages = list(iter_robot_pages({"robot": ("watch", WatchAsset)}, fetches, page_size=10))
+    assert [len(page) for _, _, page in pages] == [10, 10, 5]
+    assert "robot" not in fetches
+
+def test_pipeline_serializes_rows():
+    """Test that items flow through validation and serialization as JSON rows."""
+    fetches = {"robot": make_fetch("robot", [{"price": 15000, "model": "Submariner"}])}
+    rows = list(serialize_assets(validate_pages(iter_robot_pages({"robot": ("watch", WatchAsset)}, fetches))))
+    assert rows[0]["asset_type"] == "watch"
+    assert rows[0]["raw_data"] == {"price": 15000, "model": "Submariner"}
+    assert isinstance(rows[0]["ingestion_timestamp"], str)
+
+def test_batches_respect_row_limit():
+    """Test that batches never exceed the configured row count."""
+    batches = list(batch_rows(({"n": i} for i in range(23)), max_rows=10, max_bytes=10**6))
+    assert [len(batch) for batch in batches] == [10, 10, 3]
+
+def test_batches_respect_byte_limit():
+    """Test that batches are flushed before exceeding the byte budget."""
+    rows = [{"blob": "x" * 100} for _ in range(10)]
+    row_bytes = len(json.dumps(rows[0], separators=(",", ":")))
+    batches = list(batch_rows(rows, max_rows=100, max_bytes=row_bytes * 3))
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+
+def test_fast_path_matches_model_path():
+    """Test that batch validation emits the same rows as per-item models."""
+    stamp = datetime(2024, 1, 1, 12, 30)
+    items = [{"price": 15000, "model": "Submariner"}, {"price": 8000}]
+    expected = [WatchAsset(raw_data=item, ingestion_timestamp=stamp).model_dump(mode="json") for item in items]
+    assert validate_page_rows("watch", WatchAsset, items, stamp) == expected
+
+def test_fast_path_drops_invalid_items():
+    """Test that invalid items are skipped while the rest of the page survives."""
+    rows = validate_page_rows("watch", WatchAsset, [{"price": 1}, "not a dict", {"price": 2}])
+    assert [row["raw_data"]["price"] for row in rows] == [1, 2]
+    assert len({row["ingestion_timestamp"] for row in rows}) == 1
+
+class FakeLoadJob:
+    def __init__(self, lines, errors=None):
+        self.errors = errors
+        self.output_rows = len(lines) - len(errors or [])
+
+    def result(self):
+        return self
+
+class FakeBigQueryClient:
+    """Records streaming inserts and load jobs instead of calling BigQuery."""
+
+    def __init__(self, load_errors=None):
+        self.inserted = []
+        self.loaded = []
+        self.load_errors = load_errors
+
+    def dataset(self, dataset):
+        return self
+
+    def table(self, table):
+        return f"calif_raw.{table}"
+
+    def insert_rows_json(self, table_ref, rows, row_ids=None):
+        self.inserted.append(list(rows))
+        return []
+
+    def load_table_from_file(self, file_obj, table_ref, job_config=None):
+        lines = gzip.decompress(file_obj.read()).decode("utf-8").splitlines()
+        self.loaded.append([json.loads(line) for line in lines])
+        return FakeLoadJob(lines, self.load_errors)
+
+def test_small_runs_are_streamed(monkeypatch):
+    """Test that auto mode streams when the run is under the threshold."""
+    monkeypatch.setattr(browse_ai_ingest, "LOAD_JOB_THRESHOLD", 10)
+    client = FakeBigQueryClient()
+    rows = ({"asset_type": "watch", "source_api": "watchcharts", "raw_data": {"n": i}} for i in range(5))
+    assert write_rows(rows, client) == 5
+    assert client.inserted and not client.loaded
+
+def test_large_runs_use_one_load_job(monkeypatch):
+    """Test that auto mode switches to a single NDJSON load job above the threshold."""
+    monkeypatch.setattr(browse_ai_ingest, "LOAD_JOB_THRESHOLD", 10)
+    client = FakeBigQueryClient()
+    rows = [{"asset_type": "watch", "source_api": "watchcharts", "raw_data": {"n": i}} for i in range(25)]
+    assert write_rows(iter(rows), client) == 25
+    assert not client.inserted
+    assert client.loaded == [rows]
+
+class RecordingSeenIndex:
+    def __init__(self):
+        self.marked = []
+
+    def mark_seen(self, hashes):
+        self.marked.extend(hashes)
+
+def test_load_job_marks_rows_seen_only_when_all_were_loaded(monkeypatch):
+    """Test that a load job which rejected rows does not mark its batch as seen."""
+    monkeypatch.setattr(browse_ai_ingest, "WRITE_MODE", "load")
+    rows = [{"asset_type": "watch", "source_api": "watchcharts", "raw_data": {"n": i}} for i in range(3)]
+
+    seen_index = RecordingSeenIndex()
+    assert write_rows(iter(rows), FakeBigQueryClient(), seen_index) == 3
+    assert len(seen_index.marked) == 3
+
+    seen_index = RecordingSeenIndex()
+    client = FakeBigQueryClient(load_errors=[{"reason": "invalid", "message": "Error while reading data"}])
+    assert write_rows(iter(rows), client, seen_index) == 2
+    assert seen_index.marked == []
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from common import instrumentation
+
+if TYPE_CHECKING:
+    from slack_sdk.errors import SlackApiError
+
+# --- Configuration ---
+DIGEST_WINDOW = float(os.getenv("SLACK_DIGEST_WINDOW", "5")) # seconds a digest stays open for more signals
+DIGEST_MAX_ITEMS = int(os.getenv("SLACK_DIGEST_MAX_ITEMS", "20")) # distinct deals per message (Slack allows 50 blocks)
+DIGEST_DEDUP_TTL = float(os.getenv("SLACK_DIGEST_DEDUP_TTL", "3600")) # seconds an already-posted deal is suppressed
+SLACK_RATE = float(os.getenv("SLACK_RATE_PER_SECOND", "1")) # chat.postMessage allows ~1 message/sec per channel
+SLACK_BURST = int(os.getenv("SLACK_BURST", "3"))
+SLACK_MAX_RETRIES = int(os.getenv("SLACK_MAX_RETRIES", "5"))
+
+# --- Rate Limiting ---
+class TokenBucket:
+    """Thread-safe token bucket; pause() empties it for a server-imposed Retry-After."""
+
+    def __init__(self, rate: float = SLACK_RATE, capacity: int = SLACK_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max((1 - self._tokens) / self.rate, self._updated - now)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = max(self._updated, time.monotonic() + seconds)
+
+def slack_api_error() -> type:
+    """
+    SlackApiError, imported on first use since importing slack_sdk loads the
+    whole Web API client. Fine in `except` clauses, which are only evaluated
+    once something has been raised.
+    """
+    from slack_sdk.errors import SlackApiError
+
+    return SlackApiError
+
+def retry_after_seconds(error: "SlackApiError") -> Optional[float]:
+    """Retry-After of a 429 response, or None for any other Slack error."""
+    response = error.response
+    if getattr(response, "status_code", None) != 429:
+        return None
+    headers = {k.lower(): v for k, v in (getattr(response, "headers", None) or {}).items()}
+    value = headers.get("retry-after", "1")
+    value = value[0] if isinstance(value, list) else value
+    return float(value) if str(value).replace(".", "", 1).isdigit() else 1.0
+
+def post_with_rate_limit(client, limiter: TokenBucket, retries: int = SLACK_MAX_RETRIES, **kwargs):
+    """chat_postMessage through the limiter, waiting out 429s instead of dropping the message."""
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            response = client.chat_postMessage(**kwargs)
+            instrumentation.count("slack_posts", status="ok")
+            return response
+        except slack_api_error() as e:
+            delay = retry_after_seconds(e)
+            if delay is None or attempt == retries:
+                instrumentation.count("slack_posts", status="error")
+                raise
+            instrumentation.count("slack_posts", status="rate_limited")
+            print(f"Slack rate limited; retrying in {delay:.1f}s")
+            limiter.pause(delay)
+
+# --- Digest ---
+def dedup_key(signal: dict) -> Tuple[str, float]:
+    return (signal.get("asset_type", "N/A"), round(float(signal.get("last_price") or 0), 2))
+
+class _Batch:
+    def __init__(self):
+        self.items: "OrderedDict[Tuple[str, float], List]" = OrderedDict() # key -> [signal, repeats]
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.error: Optional[Exception] = None
+
+class DigestBatcher:
+    """
+    Group-commits concurrent deal signals into one Slack message. The first
+    caller opens a batch and sends it after `window` seconds or once it holds
+    `max_items` distinct deals; every caller blocks until that send finishes
+    and sees its outcome, so a failed post is redelivered by Pub/Sub rather
+    than lost. Repeats of the same asset type and price are collapsed, within
+    a batch and against deals posted in the last `dedup_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[Tuple[dict, int]]], None],
+        window: float = DIGEST_WINDOW,
+        max_items: int = DIGEST_MAX_ITEMS,
+        dedup_ttl: float = DIGEST_DEDUP_TTL,
+    ):
+        self.send = send
+        self.window = window
+        self.max_items = max_items
+        self.dedup_ttl = dedup_ttl
+        self._lock = threading.Lock()
+        self._current: Optional[_Batch] = None
+        self._recent: Dict[Tuple[str, float], float] = {}
+
+    def _is_recent(self, key, now: float) -> bool:
+        self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedup_ttl}
+        return key in self._recent
+
+    def submit(self, signal: dict) -> bool:
+        """Adds a signal to the open digest. Returns False if it was a suppressed repeat."""
+        key = dedup_key(signal)
+        with self._lock:
+            if self._is_recent(key, time.monotonic()):
+                instrumentation.count("slack_duplicates_suppressed")
+                return False
+            batch, leader = self._current, False
+            if batch is None:
+                batch, leader = _Batch(), True
+                self._current = batch
+            if key in batch.items:
+                batch.items[key][1] += 1
+            else:
+                batch.items[key] = [signal, 1]
+            if len(batch.items) >= self.max_items:
+                self._current = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._current is batch:
+                    self._current = None
+            try:
+                self.send([(signal, repeats) for signal, repeats in batch.items.values()])
+                with self._lock:
+                    now = time.monotonic()
+                    self._recent.update((key, now) for key in batch.items)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return True
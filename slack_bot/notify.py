@@ -1,34 +1,59 @@
 import base64
+import functools
 import json
 import os
-from typing import Optional
 
 import functions_framework
 from dotenv import load_dotenv
 from flask import Request, jsonify
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+
+from common import instrumentation
+
+try:
+    from .digest import (
+        DigestBatcher,
+        TokenBucket,
+        post_with_rate_limit,
+        slack_api_error,
+    )
+except ImportError:  # Loaded as a standalone file by functions-framework
+    from digest import DigestBatcher, TokenBucket, post_with_rate_limit, slack_api_error
 
 load_dotenv()
 
 # --- Configuration ---
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_CHANNEL = os.getenv("SLACK_CHANNEL", "#general")
+SLACK_DELIVERY_MODE = os.getenv("SLACK_DELIVERY_MODE", "single") # single | digest
 
-# Initialize Slack client
-try:
-    slack_client: Optional[WebClient] = WebClient(token=SLACK_BOT_TOKEN) if SLACK_BOT_TOKEN else None
-except Exception as e:
-    print(f"Error initializing Slack client: {e}")
-    slack_client = None
+# Slack client, created (and slack_sdk imported) on the first deal, then
+# reused by every later invocation on this instance
+@functools.lru_cache(maxsize=1)
+def get_slack_client():
+    if not SLACK_BOT_TOKEN:
+        return None
+    from slack_sdk import WebClient
+
+    try:
+        return WebClient(token=SLACK_BOT_TOKEN)
+    except Exception as e:
+        print(f"Error initializing Slack client: {e}")
+        return None
+
+# Shared by every request this instance serves
+rate_limiter = TokenBucket()
 
 # --- Message Formatting ---
+def format_number(value, spec: str) -> str:
+    """Formats a signal metric; the publisher sends NaN (e.g. a z-score over a flat window) as null."""
+    return "n/a" if value is None else format(value, spec)
+
 def format_slack_message(signal_data: dict) -> list:
     """Formats the signal data into a Slack message block."""
     asset_type = signal_data.get("asset_type", "N/A").replace("_", " ").title()
-    last_price = signal_data.get("last_price", 0)
-    mean_price = signal_data.get("rolling_mean_30d", 0)
-    z_score = signal_data.get("z_score", 0)
+    last_price = format_number(signal_data.get("last_price", 0), ",.2f")
+    mean_price = format_number(signal_data.get("rolling_mean_30d", 0), ",.2f")
+    z_score = format_number(signal_data.get("z_score", 0), ".2f")
 
     blocks = [
         {
@@ -43,17 +68,60 @@ def format_slack_message(signal_data: dict) -> list:
             "type": "section",
             "fields": [
                 {"type": "mrkdwn", "text": f"*Asset Type:*\n{asset_type}"},
-                {"type": "mrkdwn", "text": f"*Current Price:*\n${last_price:,.2f}"},
-                {"type": "mrkdwn", "text": f"*30-Day Avg Price:*\n${mean_price:,.2f}"},
-                {"type": "mrkdwn", "text": f"*Z-Score:*\n{z_score:.2f}"}
+                {"type": "mrkdwn", "text": f"*Current Price:*\n${last_price}"},
+                {"type": "mrkdwn", "text": f"*30-Day Avg Price:*\n${mean_price}"},
+                {"type": "mrkdwn", "text": f"*Z-Score:*\n{z_score}"}
             ]
         },
         {"type": "divider"}
     ]
     return blocks
 
+def format_digest_message(items: list) -> list:
+    """Formats (signal, repeats) pairs into one multi-section Slack message."""
+    blocks = [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f":money_with_wings: {len(items)} New Deal Signal{'s' if len(items) != 1 else ''}",
+                "emoji": True
+            }
+        }
+    ]
+    for signal_data, repeats in items:
+        asset_type = signal_data.get("asset_type", "N/A").replace("_", " ").title()
+        repeat_note = f" (seen {repeats}x)" if repeats > 1 else ""
+        blocks.append({
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": (
+                    f"*{asset_type}*{repeat_note}: ${format_number(signal_data.get('last_price', 0), ',.2f')} "
+                    f"vs 30-day avg ${format_number(signal_data.get('rolling_mean_30d', 0), ',.2f')} "
+                    f"(z {format_number(signal_data.get('z_score', 0), '.2f')})"
+                )
+            }
+        })
+    blocks.append({"type": "divider"})
+    return blocks
+
+def send_digest(items: list):
+    asset_types = ", ".join(sorted({signal.get("asset_type", "N/A") for signal, _ in items}))
+    post_with_rate_limit(
+        get_slack_client(),
+        rate_limiter,
+        channel=SLACK_CHANNEL,
+        text=f"{len(items)} new deal signals: {asset_types}", # Fallback text
+        blocks=format_digest_message(items),
+    )
+    print(f"Digest of {len(items)} signals posted to {SLACK_CHANNEL}")
+
+digest = DigestBatcher(send_digest)
+
 # --- Cloud Function Entrypoint for Pub/Sub ---
 @functions_framework.http
+@instrumentation.invocation("notify_slack")
 def notify_slack(request: Request):
     """
     HTTP-triggered Cloud Function that receives a Pub/Sub message
@@ -73,23 +141,35 @@ def notify_slack(request: Request):
             data_str = base64.b64decode(pubsub_message["data"]).decode("utf-8")
             signal_data = json.loads(data_str)
             print(f"Received signal: {signal_data}")
+            instrumentation.count("signals_received", is_deal=bool(signal_data.get("is_deal")))
 
             # Check if it's a deal worth notifying about
             if signal_data.get("is_deal"):
-                if not slack_client:
+                if not get_slack_client():
                     raise ValueError("Slack client is not initialized. Check SLACK_BOT_TOKEN.")
 
+                if SLACK_DELIVERY_MODE == "digest":
+                    try:
+                        with instrumentation.span("digest_submit"):
+                            sent = digest.submit(signal_data)
+                    except slack_api_error() as e:
+                        print(f"Error posting digest to Slack: {e.response['error']}")
+                        return jsonify({"status": "error", "message": str(e)}), 500
+                    return jsonify({"status": "success", "message": "Sent in digest" if sent else "Duplicate suppressed"}), 200
+
                 message_blocks = format_slack_message(signal_data)
 
                 try:
-                    slack_client.chat_postMessage(
+                    post_with_rate_limit(
+                        get_slack_client(),
+                        rate_limiter,
                         channel=SLACK_CHANNEL,
                         text=f"New Deal Signal: {signal_data.get('asset_type')}", # Fallback text
                         blocks=message_blocks
                     )
                     print(f"Message posted to {SLACK_CHANNEL}")
                     return jsonify({"status": "success"}), 200
-                except SlackApiError as e:
+                except slack_api_error() as e:
                     print(f"Error posting to Slack: {e.response['error']}")
                     return jsonify({"status": "error", "message": str(e)}), 500
             else:
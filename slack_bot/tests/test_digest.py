@@ -0,0 +1,99 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web import SlackResponse
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from slack_bot.digest import DigestBatcher, TokenBucket, post_with_rate_limit
+
+
+def signal(asset_type: str, price: float) -> dict:
+    return {"asset_type": asset_type, "last_price": price, "rolling_mean_30d": 100.0, "z_score": -2.5, "is_deal": True}
+
+def submit_concurrently(batcher: DigestBatcher, signals: list) -> list:
+    results = [None] * len(signals)
+
+    def run(i):
+        results[i] = batcher.submit(signals[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(signals))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def rate_limited_error(retry_after: str) -> SlackApiError:
+    response = SlackResponse(
+        client=None, http_verb="POST", api_url="chat.postMessage", req_args={},
+        data={"ok": False, "error": "ratelimited"}, headers={"Retry-After": retry_after}, status_code=429,
+    )
+    return SlackApiError("ratelimited", response)
+
+def test_digest_collapses_repeats_into_one_send():
+    """Test that concurrent signals within the window become one message with repeats collapsed."""
+    sent = []
+    batcher = DigestBatcher(sent.append, window=0.2, max_items=10)
+    results = submit_concurrently(batcher, [signal("watch", 80), signal("watch", 80), signal("wine", 50)])
+
+    assert results == [True, True, True]
+    assert len(sent) == 1
+    assert sorted((s["asset_type"], repeats) for s, repeats in sent[0]) == [("watch", 2), ("wine", 1)]
+
+def test_digest_flushes_when_full():
+    """Test that a batch is sent as soon as it reaches max_items, before the window ends."""
+    sent = []
+    batcher = DigestBatcher(sent.append, window=10, max_items=2)
+    start = time.monotonic()
+    submit_concurrently(batcher, [signal("watch", 80), signal("wine", 50)])
+    assert time.monotonic() - start < 5
+    assert len(sent[0]) == 2
+
+def test_digest_suppresses_recently_posted_deals():
+    """Test that a deal already posted within the TTL is not posted again."""
+    sent = []
+    batcher = DigestBatcher(sent.append, window=0, max_items=10)
+    assert batcher.submit(signal("watch", 80)) is True
+    assert batcher.submit(signal("watch", 80)) is False
+    assert len(sent) == 1
+
+def test_digest_failure_reaches_every_caller():
+    """Test that a failed send raises in every waiting caller, so Pub/Sub redelivers them all."""
+    def fail(items):
+        raise RuntimeError("slack down")
+
+    batcher = DigestBatcher(fail, window=0, max_items=10)
+    with pytest.raises(RuntimeError):
+        batcher.submit(signal("watch", 80))
+    # Nothing was marked as posted, so the redelivery goes through
+    sent = []
+    batcher.send = sent.append
+    assert batcher.submit(signal("watch", 80)) is True
+
+def test_post_retries_after_rate_limit():
+    """Test that a 429 is retried after Retry-After instead of being dropped."""
+    calls = []
+
+    class FakeClient:
+        def chat_postMessage(self, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise rate_limited_error("0")
+            return {"ok": True}
+
+    assert post_with_rate_limit(FakeClient(), TokenBucket(rate=100, capacity=1), channel="#deals") == {"ok": True}
+    assert len(calls) == 2
+
+def test_token_bucket_limits_rate():
+    """Test that the bucket allows a burst and then paces at the configured rate."""
+    bucket = TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 4 / 50 * 0.9
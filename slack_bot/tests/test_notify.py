@@ -0,0 +1,45 @@
+import base64
+import json
+import os
+import subprocess
+import sys
+
+from flask import Flask, request
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from slack_bot import notify
+
+
+def push(signal: dict) -> dict:
+    return {"message": {"data": base64.b64encode(json.dumps(signal).encode()).decode()}}
+
+def test_slack_sdk_is_imported_on_first_deal():
+    """Test that loading the entry module does not import slack_sdk."""
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    script = "import sys; import slack_bot.notify; print('slack_sdk' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "False"
+
+def test_non_deal_is_acknowledged_without_a_slack_client(monkeypatch):
+    """Test that a non-deal push is answered without creating the Slack client."""
+    created = []
+    monkeypatch.setattr(notify, "get_slack_client", lambda: created.append(True))
+    with Flask("test").test_request_context("/", method="POST", json=push({"asset_type": "watch", "is_deal": False})):
+        body, status = notify.notify_slack(request)
+    assert status == 200
+    assert body.get_json()["message"] == "Not a deal"
+    assert not created
+
+def test_digest_renders_missing_z_score_as_na():
+    """Test that a signal whose z-score was published as null is shown as n/a instead of failing the digest."""
+    items = [
+        ({"asset_type": "watch", "last_price": 90.0, "rolling_mean_30d": 110.0, "z_score": None}, 1),
+        ({"asset_type": "private_jet", "last_price": 1000.0, "rolling_mean_30d": 1200.0, "z_score": -2.5}, 2),
+    ]
+    blocks = notify.format_digest_message(items)
+    assert "(z n/a)" in blocks[1]["text"]["text"]
+    assert "(z -2.50)" in blocks[2]["text"]["text"]
+    fields = notify.format_slack_message(items[0][0])[1]["fields"]
+    assert fields[3]["text"] == "*Z-Score:*\nn/a"
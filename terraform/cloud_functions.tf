@@ -24,9 +24,10 @@ resource "google_cloudfunctions2_function" "analytics" {
     timeout_seconds    = 300
     service_account_email = google_service_account.calif_runtime.email
     environment_variables = {
-      GCP_PROJECT_ID   = var.gcp_project_id
-      BIGQUERY_DATASET = "calif_raw"
-      BIGQUERY_TABLE   = "listings"
+      GCP_PROJECT_ID       = var.gcp_project_id
+      BIGQUERY_DATASET     = "calif_raw"
+      BIGQUERY_TABLE       = "listings"
+      SIGNALS_PUBSUB_TOPIC = google_pubsub_topic.signals_new.id
     }
     secret_environment_variables {
       key          = "POSTGRES_DB_URL"
@@ -58,8 +59,13 @@ resource "google_cloudfunctions2_function" "slack_bot" {
     max_instance_count    = 2
     min_instance_count    = 0
     available_memory      = "256Mi"
+    available_cpu         = "1"
     timeout_seconds       = 60
     service_account_email = google_service_account.calif_runtime.email
+
+    # Concurrent pushes share one instance so they can be batched into a digest
+    max_instance_request_concurrency = 40
+
     # The slack bot function needs the slack token and channel
     secret_environment_variables {
       key        = "SLACK_BOT_TOKEN"
@@ -68,7 +74,8 @@ resource "google_cloudfunctions2_function" "slack_bot" {
       version    = "latest"
     }
     environment_variables = {
-      SLACK_CHANNEL = var.slack_channel
+      SLACK_CHANNEL       = var.slack_channel
+      SLACK_DELIVERY_MODE = "digest"
     }
     # Allow unauthenticated access for Pub/Sub push, but we use OIDC for security
     ingress_settings = "ALLOW_ALL"
@@ -9,6 +9,9 @@ resource "google_cloud_run_v2_service" "api" {
       max_instance_count = 5
     }
 
+    # /signals/stream holds requests open; EventSource clients resume via Last-Event-ID when cut off
+    timeout = "3600s"
+
     containers {
       image = "us-central1-docker.pkg.dev/${var.gcp_project_id}/${var.repo_name}/api:latest"
       ports {
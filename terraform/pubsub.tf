@@ -10,7 +10,8 @@ resource "google_pubsub_subscription" "slack_notifier" {
   name    = "slack-notifier-push"
   topic   = google_pubsub_topic.signals_new.name
 
-  ack_deadline_seconds = 60
+  ack_deadline_seconds    = 60
+  enable_message_ordering = true # the analytics job publishes with asset_type ordering keys
 
   push_config {
     push_endpoint = google_cloudfunctions2_function.slack_bot.uri
@@ -23,4 +24,11 @@ resource "google_pubsub_subscription" "slack_notifier" {
   depends_on = [
     google_cloudfunctions2_function.slack_bot
   ]
-} 
\ No newline at end of file
+} 
+# Let the analytics job publish signal changes
+resource "google_pubsub_topic_iam_member" "analytics_publisher" {
+  project = var.gcp_project_id
+  topic   = google_pubsub_topic.signals_new.name
+  role    = "roles/pubsub.publisher"
+  member  = "serviceAccount:${google_service_account.calif_runtime.email}"
+}